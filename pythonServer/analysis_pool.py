@@ -0,0 +1,114 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import threading
+import time
+
+# Pool de procesos acotado para el análisis asíncrono. Limita el número de
+# trabajos en espera (el resto se rechaza) y registra la espera en cola y el
+# tiempo de CPU ocupado para reportar la utilización. Si un worker muere, el
+# pool queda inutilizable y se reemplaza por uno nuevo.
+
+
+class PoolFull(Exception):
+    pass
+
+
+def timed_call(function, submitted_at, *args):
+    # Se ejecuta en el proceso worker: mide la espera en cola y la duración
+    started_at = time.time()
+    result = function(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+class AnalysisPool:
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        # Reentrante: al cancelar futuros (shutdown) sus callbacks corren en el mismo hilo
+        self._lock = threading.RLock()
+        self.created_at = time.time()
+        self.pending = 0  # Enviados y aún sin terminar (en cola o ejecutándose)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.busy_seconds = 0.0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _reset_executor(self, broken_executor):
+        # Se llama con el lock tomado; solo se descarta si nadie lo reemplazó antes
+        if self._executor is broken_executor:
+            self._executor = None
+        broken_executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, function, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolFull(f"Hay {self.pending} análisis en curso")
+            executor = self._get_executor()
+            try:
+                future = executor.submit(timed_call, function, time.time(), *args)
+            except BrokenProcessPool:
+                self._reset_executor(executor)
+                executor = self._get_executor()
+                future = executor.submit(timed_call, function, time.time(), *args)
+            # Solo cuenta si el envío tuvo éxito; _finished lo descuenta
+            self.pending += 1
+        future.add_done_callback(partial(self._finished, executor))
+        return future
+
+    def _finished(self, executor, future):
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                self.failed += 1
+                if isinstance(error, BrokenProcessPool):
+                    self._reset_executor(executor)
+                return
+            _, queue_wait, run_seconds = future.result()
+            self.completed += 1
+            self.busy_seconds += run_seconds
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+
+    def run(self, function, *args, timeout=None):
+        # Espera el resultado sin ocupar CPU. Lanza PoolFull si la cola está llena,
+        # TimeoutError si se agota el tiempo y BrokenProcessPool si el worker murió.
+        future = self.submit(function, *args)
+        try:
+            result, _, _ = future.result(timeout)
+        except FutureTimeoutError:
+            # Si aún no empezó se descarta; si ya se ejecuta, ocupa su worker hasta terminar
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise
+        return result
+
+    def stats(self):
+        with self._lock:
+            elapsed = max(time.time() - self.created_at, 1e-9)
+            return {
+                "workers": self.max_workers,
+                "maxPending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "utilization": self.busy_seconds / (self.max_workers * elapsed),
+                "queueWaitAvg": self.queue_wait_total / self.completed if self.completed else 0.0,
+                "queueWaitMax": self.queue_wait_max,
+            }
@@ -0,0 +1,65 @@
+import argparse
+import time
+
+from main import Lexer, LEXER_BACKENDS
+
+# Programa de ejemplo que se repite para generar entradas grandes
+SAMPLE_PROGRAM = """int _contador = 0;
+double _promedio = 3.5;
+string _nombre = "Nova";
+// Ciclo principal
+function int _sumar(int _a) {
+    return _a + 1;
+}
+while (_contador < 10) {
+    _contador = _contador + 1;
+    _promedio = (_promedio * 2 - 1) / 3;
+    output("Valor: ");
+}
+if (_contador == 10) {
+    output(_nombre);
+} else {
+    input(_nombre);
+}"""
+
+
+def build_input(lines):
+    sample_lines = SAMPLE_PROGRAM.split("\n")
+    repeated = sample_lines * (lines // len(sample_lines) + 1)
+    return "\n".join(repeated[:lines])
+
+
+def time_backend(backend, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        Lexer(text, backend=backend).tokenize()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los backends del lexer")
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for lines in args.lines:
+        text = build_input(lines)
+
+        # Ambos backends deben producir exactamente los mismos tokens
+        reference = Lexer(text)
+        reference.tokenize()
+        for backend in LEXER_BACKENDS:
+            lexer = Lexer(text, backend=backend)
+            lexer.tokenize()
+            if lexer.tokens != reference.tokens or lexer.errors != reference.errors:
+                raise SystemExit(f"El backend {backend} no coincide con regex en {lines} líneas")
+
+        results = {backend: time_backend(backend, text, args.repeat) for backend in LEXER_BACKENDS}
+        summary = "  ".join(f"{backend}: {seconds * 1000:.1f} ms" for backend, seconds in results.items())
+        print(f"{lines:>7} líneas  {len(reference.tokens):>8} tokens  {summary}")
+
+
+if __name__ == "__main__":
+    main()
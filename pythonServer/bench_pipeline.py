@@ -0,0 +1,186 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+
+from main import Lexer, analysis_sections
+from metrics import StageTimer
+from serialization import encode_response
+
+# Generador de programas Nova sintéticos. Cada forma produce líneas con un perfil
+# distinto: muchas declaraciones, anidación profunda, expresiones largas,
+# comentarios abundantes o código con muchos errores.
+SHAPES = ("mixto", "declaraciones", "anidado", "expresiones", "comentarios", "errores")
+DECLARATION_TYPES = ("int", "double", "string")
+OPERATORS = ("+", "-", "*", "/")
+
+
+def identifier(rng, count=50):
+    return f"_v{rng.randrange(count)}"
+
+
+def operand(rng):
+    choice = rng.random()
+    if choice < 0.6:
+        return identifier(rng)
+    if choice < 0.85:
+        return str(rng.randrange(1000))
+    return f"{rng.randrange(100)}.{rng.randrange(100)}"
+
+
+def arithmetic(rng, terms):
+    parts = [operand(rng)]
+    for _ in range(terms - 1):
+        parts.append(rng.choice(OPERATORS))
+        parts.append(operand(rng))
+    # Agrupar un tramo al azar entre paréntesis
+    if terms > 2:
+        start = rng.randrange(0, len(parts) - 2, 2)
+        parts[start] = "(" + parts[start]
+        parts[start + 2] = parts[start + 2] + ")"
+    return " ".join(parts)
+
+
+def declaration(rng):
+    var_type = rng.choice(DECLARATION_TYPES)
+    if var_type == "string":
+        return f'string {identifier(rng)} = "texto {rng.randrange(100)}";'
+    return f"{var_type} {identifier(rng)} = {operand(rng)};"
+
+
+def statement(rng, terms=4):
+    choice = rng.random()
+    if choice < 0.4:
+        return f"{identifier(rng)} = {arithmetic(rng, terms)};"
+    if choice < 0.6:
+        return declaration(rng)
+    if choice < 0.8:
+        return f"output({identifier(rng)});"
+    return f"input({identifier(rng)});"
+
+
+def erroneous(rng):
+    return rng.choice((
+        f"{identifier(rng)} {identifier(rng)} = 3;",
+        f"int = {operand(rng)};",
+        f"v{rng.randrange(50)} = {operand(rng)};",
+        f"{identifier(rng)} = {operand(rng)} @ {operand(rng)};",
+        f"{identifier(rng)} += 1;",
+        f"return {operand(rng)} + ;",
+        "}",
+        f'string {identifier(rng)} = 5;',
+    ))
+
+
+def block(rng, depth, indent=""):
+    # Estructura de control con `depth` niveles de anidación (4 + 2*depth líneas)
+    lines = []
+    keyword = rng.choice(("if", "while"))
+    lines.append(f"{indent}{keyword} ({identifier(rng)} < {rng.randrange(100)}) {{")
+    if depth > 1:
+        lines.extend(block(rng, depth - 1, indent + "    "))
+    else:
+        lines.append(f"{indent}    {statement(rng)}")
+    lines.append(f"{indent}    {statement(rng)}")
+    lines.append(f"{indent}}}")
+    return lines
+
+
+def generate_program(lines, shape="mixto", seed=0):
+    rng = random.Random(seed)
+    output = []
+    function_count = 0
+    while len(output) < lines:
+        if shape == "declaraciones":
+            output.append(declaration(rng))
+        elif shape == "anidado":
+            output.extend(block(rng, rng.randint(5, 20)))
+        elif shape == "expresiones":
+            output.append(f"{identifier(rng)} = {arithmetic(rng, rng.randint(10, 60))};")
+        elif shape == "comentarios":
+            output.append(f"// Comentario {rng.randrange(10000)}: {' '.join(identifier(rng) for _ in range(8))}")
+            if rng.random() < 0.5:
+                output.append(f"{statement(rng)} // nota {rng.randrange(100)}")
+        elif shape == "errores":
+            output.append(erroneous(rng) if rng.random() < 0.5 else statement(rng))
+        else:
+            choice = rng.random()
+            if choice < 0.05:
+                function_count += 1
+                output.append(f"function int _f{function_count}(int {identifier(rng)}) {{")
+                output.append(f"    return {arithmetic(rng, 3)};")
+                output.append("}")
+            elif choice < 0.15:
+                output.extend(block(rng, rng.randint(1, 4)))
+            elif choice < 0.2:
+                output.append(f"// {identifier(rng)}")
+            elif choice < 0.25:
+                output.append(erroneous(rng))
+            else:
+                output.append(statement(rng))
+    return "\n".join(output[:lines])
+
+
+def run_stages(text, profile_rules=False):
+    # Tiempos (s) de cada etapa de /tokenize, sin la caché de líneas entre repeticiones.
+    # Con profile_rules también devuelve el tiempo de cada regla semántica
+    timer = StageTimer(profile_rules=profile_rules)
+    with timer.stage("tokenize"):
+        lex = Lexer(text)
+        lex.tokenize()
+    result = analysis_sections(lex, timer)
+    with timer.stage("json"):
+        body = encode_response(result, lex.get_tokens())
+
+    counts = {"tokens": len(lex.tokens), "errors": len(result["errores"]), "bytes": len(body)}
+    return timer.wall, counts, timer.rules
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide cada etapa del análisis sobre programas sintéticos")
+    parser.add_argument("--lines", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--repeat", type=int, default=3, help="se reporta el mejor tiempo de cada etapa")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = []
+    for shape in args.shapes:
+        for lines in args.lines:
+            text = generate_program(lines, shape, args.seed)
+            best = None
+            for _ in range(args.repeat):
+                stages, counts, _ = run_stages(text)
+                best = stages if best is None else {name: min(best[name], stages[name]) for name in stages}
+            # Medir cada regla encarece detect_errors: se hace en una pasada aparte
+            _, _, rules = run_stages(text, profile_rules=True)
+            results.append({"shape": shape, "lines": lines, **counts, "stages": best, "total": sum(best.values()), "rules": rules})
+            summary = "  ".join(f"{name}: {seconds * 1000:.1f}" for name, seconds in best.items())
+            print(f"{shape:>13} {lines:>7} líneas  {counts['tokens']:>8} tokens  {summary} (ms)")
+            print(" " * 22 + "reglas  " + "  ".join(f"{name}: {seconds * 1000:.1f}" for name, seconds in rules.items()) + " (ms)")
+
+    report = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import json
+
+from serialization import encode_response
+
+# Formato binario columnar de la respuesta de /tokenize (Accept: application/x-nova-tokens).
+#
+#   "NVT1"                         firma y versión
+#   varint + JSON                  resto de secciones pedidas (identificadores, errores, ...)
+#   byte                           1 si hay bloque de tokens, 0 si no se pidieron
+#   tabla de tipos                 varint n + n cadenas (varint longitud + UTF-8)
+#   tabla de identificadores       varint n + n nombres; el identificador con ID k es el k-ésimo
+#   varint n                       número de tokens
+#   columna de tipos               n varints: índice en la tabla de tipos
+#   columna de líneas              n varints: diferencia con la línea del token anterior
+#   columna de valores             IDEN: varint ID; resto: varint distancia desde el final
+#                                  del valor anterior y varint longitud (en caracteres del código)
+#
+# Los valores que no son identificadores no se copian: se recortan del código que envió el cliente.
+
+MEDIA_TYPE = "application/x-nova-tokens"
+MAGIC = b"NVT1"
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def write_string(out, text):
+    encoded = text.encode("utf-8")
+    write_varint(out, len(encoded))
+    out += encoded
+
+
+def read_string(data, position):
+    length, position = read_varint(data, position)
+    return data[position:position + length].decode("utf-8"), position + length
+
+
+def line_starts(text):
+    # Posición en el código del primer carácter de cada línea
+    starts = [0]
+    position = text.find("\n")
+    while position != -1:
+        starts.append(position + 1)
+        position = text.find("\n", position + 1)
+    return starts
+
+
+def encode_token_columns(out, tokens, text, identifier_names):
+    type_indexes = {}
+    types = []
+    type_column = bytearray()
+    line_column = bytearray()
+    value_column = bytearray()
+    starts = line_starts(text)
+
+    find = text.find
+    previous_line = 0
+    position = 0  # Final del último token en el código
+    previous_end = 0  # Final del último valor escrito como desplazamiento
+    # Casi todos los números caben en un byte: se escriben sin pasar por write_varint
+    for token in tokens:
+        type_index = type_indexes.get(token.type)
+        if type_index is None:
+            type_index = type_indexes[token.type] = len(types)
+            types.append(token.type)
+        if type_index < 0x80:
+            type_column.append(type_index)
+        else:
+            write_varint(type_column, type_index)
+
+        line = token.line
+        if line == previous_line:
+            line_column.append(0)
+        else:
+            write_varint(line_column, line - previous_line)
+            previous_line = line
+            position = starts[line - 1]
+
+        # Los tokens aparecen en orden dentro de su línea: basta buscar desde el anterior
+        value = token.value
+        start = find(value, position)
+        position = start + len(value)
+        if token.id is not None:
+            write_varint(value_column, token.id)
+        else:
+            distance = start - previous_end
+            if distance < 0x80 and len(value) < 0x80:
+                value_column.append(distance)
+                value_column.append(len(value))
+            else:
+                write_varint(value_column, distance)
+                write_varint(value_column, len(value))
+            previous_end = position
+
+    write_varint(out, len(types))
+    for type_name in types:
+        write_string(out, type_name)
+    write_varint(out, len(identifier_names))
+    for name in identifier_names:
+        write_string(out, name)
+    write_varint(out, len(tokens))
+    out += type_column
+    out += line_column
+    out += value_column
+
+
+def encode_binary_response(sections, lex=None):
+    # `lex` es el Lexer ya ejecutado si se pidieron los tokens
+    out = bytearray(MAGIC)
+    sections_json = encode_response(sections)
+    write_varint(out, len(sections_json))
+    out += sections_json
+    if lex is None:
+        out.append(0)
+    else:
+        out.append(1)
+        # Los símbolos se internan con IDs consecutivos: el de ID k es el k-ésimo
+        encode_token_columns(out, lex.get_tokens(), lex.text, list(lex.symbols.by_name))
+    return bytes(out)
+
+
+def decode_binary_response(data, text):
+    # Inverso de encode_binary_response: el mismo diccionario que la respuesta JSON.
+    # `text` es el código enviado a /tokenize, del que se recortan los valores.
+    if data[:4] != MAGIC:
+        raise ValueError("No es una respuesta binaria de tokens de Nova")
+    length, position = read_varint(data, 4)
+    result = json.loads(data[position:position + length])
+    position += length
+    has_tokens = data[position]
+    position += 1
+    if not has_tokens:
+        return result
+
+    type_count, position = read_varint(data, position)
+    types = []
+    for _ in range(type_count):
+        type_name, position = read_string(data, position)
+        types.append(type_name)
+    name_count, position = read_varint(data, position)
+    names = []
+    for _ in range(name_count):
+        name, position = read_string(data, position)
+        names.append(name)
+    token_count, position = read_varint(data, position)
+
+    if type_count <= 0x80:
+        # Cada índice ocupa un byte
+        token_types = [types[type_index] for type_index in data[position:position + token_count]]
+        position += token_count
+    else:
+        token_types = []
+        for _ in range(token_count):
+            type_index, position = read_varint(data, position)
+            token_types.append(types[type_index])
+    lines = []
+    line = 0
+    for _ in range(token_count):
+        delta = data[position]
+        if delta < 0x80:
+            position += 1
+        else:
+            delta, position = read_varint(data, position)
+        line += delta
+        lines.append(line)
+
+    tokens = []
+    previous_end = 0
+    for token_type, line in zip(token_types, lines):
+        if token_type == "IDEN":
+            identifier_id = data[position]
+            if identifier_id < 0x80:
+                position += 1
+            else:
+                identifier_id, position = read_varint(data, position)
+            tokens.append({"type": "IDEN", "id": identifier_id, "value": names[identifier_id - 1], "line": line})
+        else:
+            distance = data[position]
+            length = data[position + 1]
+            if distance < 0x80 and length < 0x80:
+                position += 2
+            else:
+                distance, position = read_varint(data, position)
+                length, position = read_varint(data, position)
+            start = previous_end + distance
+            previous_end = start + length
+            tokens.append({"type": token_type, "value": text[start:previous_end], "line": line})
+    result["tokens"] = tokens
+    return result
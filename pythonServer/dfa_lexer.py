@@ -0,0 +1,197 @@
+from array import array
+import re
+
+# Backend del lexer basado en un autómata finito determinista (DFA).
+#
+# La tabla de transiciones sigue el mismo formato que pythonScript/matriz.csv
+# (estado x clase de carácter -> siguiente estado), pero se genera a partir de la
+# tabla `patterns` del lexer, porque la matriz original describe un conjunto de
+# tokens anterior (break, switch, CNINT, ...) y no reproduce los tokens actuales.
+#
+# El autómata imita la semántica de la alternancia ordenada de `re`: se avanza
+# mientras haya transición y se regresa al último estado de aceptación.
+
+# Clases de carácter: un código por carácter ASCII más dos clases para el resto
+WORD_OTHER = 128  # Carácter de palabra no ASCII (cuenta para \b pero no para los patrones)
+OTHER = 129
+NUM_CLASSES = 130
+
+DEAD = 0
+
+KEYWORD_PATTERN = re.compile(r"\\b([a-zA-Z]+)\\b")
+CHAR_PATTERN = re.compile(r"\[(\\?.)\]")
+
+WORD_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+IDENT_START = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_"
+DIGITS = "0123456789"
+
+
+def is_word_char(char):
+    # Misma definición de carácter de palabra que usa \b en `re`
+    return char.isalnum() or char == "_"
+
+
+class DFAScanner:
+    def __init__(self, pattern_table):
+        self._transitions = [{}]  # Estado 0: estado muerto
+        self._accept = [None]
+        self._word_states = set()
+        self._build(pattern_table)
+
+        # Compactar la tabla en un arreglo plano indexado por estado * NUM_CLASSES + clase
+        self.table = array("H", [DEAD]) * (len(self._transitions) * NUM_CLASSES)
+        for state, transitions in enumerate(self._transitions):
+            for klass, target in transitions.items():
+                self.table[state * NUM_CLASSES + klass] = target
+        self.accept = self._accept
+        self.word_state = bytes(state in self._word_states for state in range(len(self._accept)))
+        self.num_states = len(self._accept)
+
+    def _new_state(self, token_type=None):
+        self._transitions.append({})
+        self._accept.append(token_type)
+        return len(self._accept) - 1
+
+    def _build(self, pattern_table):
+        keywords = {}
+        single_chars = {}
+        special = {}
+
+        for pattern, token_type in pattern_table:
+            keyword = KEYWORD_PATTERN.fullmatch(pattern)
+            char = CHAR_PATTERN.fullmatch(pattern)
+            if token_type in ("NUMDB", "NUMINT", "IDEN", "BRKLN", "COMM", "STR"):
+                special[token_type] = pattern
+            elif keyword:
+                keywords.setdefault(keyword.group(1), token_type)
+            elif char:
+                single_chars.setdefault(char.group(1).lstrip("\\"), token_type)
+            elif pattern.lstrip("\\")[0] in single_chars:
+                # Un literal cuyo primer carácter ya es un token de un carácter nunca coincide
+                continue
+            else:
+                raise ValueError(f"Patrón no soportado por el backend DFA: {pattern}")
+
+        missing = {"NUMDB", "NUMINT", "IDEN", "BRKLN", "COMM", "STR"} - special.keys()
+        if missing:
+            raise ValueError(f"Faltan patrones para el backend DFA: {', '.join(sorted(missing))}")
+
+        start = self._new_state()
+        start_after_word = self._new_state()
+        self.start = start
+        self.start_after_word = start_after_word
+        go = self._transitions
+
+        # Identificadores y palabras reservadas (trie de palabras reservadas)
+        identifier = self._new_state("IDEN")
+        self._word_states.add(identifier)
+        for char in WORD_CHARS:
+            go[identifier][ord(char)] = identifier
+
+        trie = {"": start}
+        for keyword in sorted(keywords):
+            for length in range(1, len(keyword) + 1):
+                prefix = keyword[:length]
+                if prefix not in trie:
+                    trie[prefix] = self._new_state(keywords.get(prefix, "IDEN"))
+                    self._word_states.add(trie[prefix])
+                    go[trie[prefix[:-1]]][ord(prefix[-1])] = trie[prefix]
+        for prefix, state in trie.items():
+            chars = IDENT_START if state == start else WORD_CHARS
+            for char in chars:
+                go[state].setdefault(ord(char), identifier)
+
+        # Constantes numéricas: [+-]?[0-9]+ y [+-]?[0-9]+\.[0-9]+
+        integer = self._new_state("NUMINT")
+        dot = self._new_state()
+        double = self._new_state("NUMDB")
+        for char in DIGITS:
+            go[start][ord(char)] = integer
+            go[integer][ord(char)] = integer
+            go[dot][ord(char)] = double
+            go[double][ord(char)] = double
+        go[integer][ord(".")] = dot
+
+        # Tokens de un solo carácter; + y - también pueden iniciar un número
+        for char, token_type in single_chars.items():
+            state = self._new_state(token_type)
+            go[start][ord(char)] = state
+            if char in "+-":
+                for digit in DIGITS:
+                    go[state][ord(digit)] = integer
+
+        # Comentario: // hasta el fin de línea (tiene prioridad sobre la división)
+        slash = go[start].get(ord("/"))
+        if slash is None:
+            slash = go[start][ord("/")] = self._new_state()
+        comment = self._new_state("COMM")
+        go[slash][ord("/")] = comment
+        for klass in range(NUM_CLASSES):
+            if klass != ord("\n"):
+                go[comment][klass] = comment
+
+        # Cadena: la última comilla antes de un // o del fin de línea
+        string_open = self._new_state()
+        string_slash = self._new_state()
+        string_closed = self._new_state("STR")
+        go[start][ord('"')] = string_open
+        for state in (string_open, string_slash, string_closed):
+            for klass in range(NUM_CLASSES):
+                if klass != ord("\n"):
+                    go[state][klass] = string_open
+            go[state][ord('"')] = string_closed
+            go[state][ord("/")] = string_slash
+        del go[string_slash][ord("/")]
+
+        # Salto de línea
+        go[start][ord("\n")] = self._new_state("BRKLN")
+
+        # Después de un carácter de palabra no puede empezar un identificador (\b)
+        go[start_after_word].update(go[start])
+        for char in IDENT_START:
+            del go[start_after_word][ord(char)]
+
+    def scan(self, text):
+        table = self.table
+        accept = self.accept
+        word_state = self.word_state
+        start = self.start
+        start_after_word = self.start_after_word
+        length = len(text)
+        position = 0
+        previous_is_word = False
+
+        while position < length:
+            state = start_after_word if previous_is_word else start
+            index = position
+            last_type = None
+            last_end = position
+            last_state = DEAD
+            while index < length:
+                char = text[index]
+                code = ord(char)
+                if code >= 128:
+                    code = WORD_OTHER if char.isalnum() else OTHER
+                state = table[state * NUM_CLASSES + code]
+                if state == DEAD:
+                    break
+                index += 1
+                token_type = accept[state]
+                if token_type is not None:
+                    last_type = token_type
+                    last_end = index
+                    last_state = state
+
+            # Un identificador seguido de un carácter de palabra no ASCII no cierra en \b
+            if last_type is not None and word_state[last_state] and last_end < length \
+                    and is_word_char(text[last_end]):
+                last_type = None
+
+            if last_type is None:
+                previous_is_word = is_word_char(text[position])
+                position += 1
+                continue
+
+            yield last_type, position, last_end
+            previous_is_word = is_word_char(text[last_end - 1])
+            position = last_end
@@ -1,6 +1,24 @@
 from flask import Flask, request, jsonify
 import re
+from array import array
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from itertools import chain, count
 from flask_cors import CORS
+from dfa_lexer import DFAScanner
+from analysis_pool import AnalysisPool, PoolFull
+from metrics import StageTimer, MetricsRegistry, ProfileSampler
+from result_cache import ResultCache, LineCache, content_key
+from serialization import encode_json, encode_response, encode_tokens, negotiate_encoding, compress, MIN_COMPRESS_BYTES
+import binary_tokens
+from nova_parser import parse_assignment, parse_statements, build_program, assignment_to_prefix, assignment_to_triplets
 
 # Definición de patrones para el lexer (sin switch, endfor, endif)
 patterns = [
@@ -58,6 +76,77 @@ patterns = [
     (r'".*"', "STR"),
 ]
 
+# Motor del lexer: la tabla de patrones se compila una sola vez en una expresión
+# maestra con grupos nombrados, de modo que match.lastgroup indica el token encontrado.
+COMMENT_GROUP = "COMM"
+# Espacios sin salto de línea: se consumen de una vez en lugar de fallar la alternancia
+# completa en cada carácter, y el scanner los descarta
+WHITESPACE_GROUP = "WS"
+# Una cadena no puede cruzar el inicio de un comentario (equivale a recortar la línea en //)
+STRING_PATTERN = r'"(?:(?!//).)*"'
+
+def build_master_regex(pattern_table):
+    # El comentario va primero para que "//" nunca se lea como dos divisiones
+    parts = [rf"(?P<{WHITESPACE_GROUP}>[^\S\n]+)", rf"(?P<{COMMENT_GROUP}>//[^\n]*)"]
+    group_types = {WHITESPACE_GROUP: None, COMMENT_GROUP: "COMM"}
+    for index, (pattern, token_type) in enumerate(pattern_table):
+        if token_type == "COMM":
+            continue
+        if token_type == "STR":
+            pattern = STRING_PATTERN
+        group = f"T{index}"
+        group_types[group] = token_type
+        parts.append(f"(?P<{group}>{pattern})")
+    return re.compile("|".join(parts)), group_types
+
+MASTER_REGEX, GROUP_TYPES = build_master_regex(patterns)
+
+def scan_with_regex(text):
+    # Los espacios no se emiten: no cuentan como token ni mueven el final del anterior,
+    # y el texto no reconocido se recorta igual que antes
+    group_types = GROUP_TYPES
+    for match in MASTER_REGEX.finditer(text):
+        token_type = group_types[match.lastgroup]
+        if token_type is not None:
+            yield token_type, match.start(), match.end()
+
+# Backends disponibles para Lexer; cada uno produce (tipo, inicio, fin) sobre el texto
+LEXER_BACKENDS = {
+    "regex": scan_with_regex,
+    "dfa": DFAScanner(patterns).scan,
+}
+
+# Códigos enteros por tipo de token para clasificar sin comparar cadenas
+TOKEN_CODES = {}
+for _, token_type in patterns:
+    TOKEN_CODES.setdefault(token_type, len(TOKEN_CODES))
+ARITHMETIC_CODES = frozenset(code for token_type, code in TOKEN_CODES.items() if token_type.startswith("AOP"))
+DATA_TYPE_CODES = frozenset(code for token_type, code in TOKEN_CODES.items() if token_type.startswith("TP"))
+
+# Token compacto; solo se convierte a diccionario al construir la respuesta JSON
+class Token:
+    __slots__ = ("type", "value", "line", "id", "code")
+
+    def __init__(self, token_type, value, line, identifier_id=None):
+        self.type = token_type
+        self.value = value
+        self.line = line
+        self.id = identifier_id
+        self.code = TOKEN_CODES[token_type]
+
+    def to_dict(self):
+        if self.id is None:
+            return {"type": self.type, "value": self.value, "line": self.line}
+        return {"type": self.type, "id": self.id, "value": self.value, "line": self.line}
+
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.type, self.value, self.line, self.id) == (other.type, other.value, other.line, other.id)
+
+    def __repr__(self):
+        return f"Token({self.type!r}, {self.value!r}, line={self.line})"
+
 app = Flask(__name__)
 CORS(app)
 
@@ -79,6 +168,51 @@ error_messages = {
     'INCOMPLETE_INPUT': "Función input incompleta (faltan paréntesis)"
 }
 
+# Colección de errores sin duplicados que conserva el orden de inserción.
+# Dos errores son iguales si coinciden en (tipo, línea, variable, mensaje).
+class ErrorCollection:
+    # El balance de símbolos es una comprobación de todo el programa: que su error caiga
+    # en la línea del símbolo no debe ocultar los errores sintácticos de esa línea
+    LINE_CLEAR_EXEMPT_TYPES = {'SYMBOL_IMBALANCE'}
+
+    def __init__(self, errors=()):
+        self._errors = {}
+        self._lines = set()  # Líneas con errores agregados mediante add() (salvo los exentos)
+        for error in errors:
+            self.add(error)
+
+    @staticmethod
+    def key(error):
+        return (error['type'], error['line'], error.get('variable'), error.get('message'))
+
+    def add(self, error):
+        key = self.key(error)
+        if key in self._errors:
+            return False
+        self._errors[key] = error
+        if error['type'] not in self.LINE_CLEAR_EXEMPT_TYPES:
+            self._lines.add(error['line'])
+        return True
+
+    def add_if_line_clear(self, error):
+        # Los errores sintácticos se omiten en líneas que ya tienen errores semánticos
+        if error['line'] in self._lines:
+            return False
+        key = self.key(error)
+        if key in self._errors:
+            return False
+        self._errors[key] = error
+        return True
+
+    def to_list(self):
+        return list(self._errors.values())
+
+    def __iter__(self):
+        return iter(self._errors.values())
+
+    def __len__(self):
+        return len(self._errors)
+
 # Palabras reservadas válidas
 valid_keywords = {
     'TRY', 'INP', 'OUT', 'CLEAR', 
@@ -118,492 +252,642 @@ def are_types_compatible(type1, type2):
     
     return False
 
+# Datos de un identificador. Se interna la primera vez que el lexer lo encuentra y
+# sus apariciones (índices en lexer.tokens) se registran a medida que se analiza cada línea
+class Symbol:
+    __slots__ = ("name", "id", "type", "value", "occurrences", "first_line", "last_line")
+
+    def __init__(self, name, identifier_id):
+        self.name = name
+        self.id = identifier_id
+        self.reset()
+
+    def reset(self):
+        self.type = None  # Último tipo con el que se declaró
+        self.value = None  # Último valor literal asignado
+        self.occurrences = []
+        self.first_line = None
+        self.last_line = None
+
+    @property
+    def tracked(self):
+        # Declarado o con un valor asignado: aparece en la tabla de identificadores
+        return self.type is not None or self.value is not None
+
+    def to_dict(self):
+        return {
+            "line": self.last_line,
+            "firstLine": self.first_line,
+            "occurrences": len(self.occurrences),
+            "type": self.type,
+            "name": self.name,
+            "value": self.value
+        }
+
+class SymbolTable:
+    def __init__(self):
+        self.by_name = {}  # Nombre -> Symbol; los IDs se conservan entre ediciones
+        self.order = []  # Símbolos por orden de primera aparición en el programa actual
+
+    def intern(self, name):
+        symbol = self.by_name.get(name)
+        if symbol is None:
+            symbol = self.by_name[name] = Symbol(name, len(self.by_name) + 1)
+        return symbol
+
+    def get(self, name):
+        return self.by_name.get(name)
+
+    def add_occurrence(self, symbol, index, line):
+        if not symbol.occurrences:
+            symbol.first_line = line
+            self.order.append(symbol)
+        symbol.occurrences.append(index)
+        symbol.last_line = line
+
+    def reset_occurrences(self):
+        for symbol in self.by_name.values():
+            symbol.reset()
+        self.order = []
+
+    def identifier_types(self):
+        # Tipos normalizados de las variables declaradas
+        return {symbol.name: normalize_type(symbol.type) for symbol in self.order if symbol.type}
+
+# Índice de ámbitos construido en un solo recorrido hacia adelante. Para cada
+# posición de token guarda la última función declarada antes de él y la función
+# cuyo cuerpo lo contiene (índices en `functions`, -1 si no hay).
+class ScopeIndex:
+    def __init__(self, tokens):
+        self.functions = []  # Funciones declaradas (nombre, tipo de retorno, línea)
+        self.last_function = array('i')
+        self.enclosing_function = array('i')
+
+        current = -1
+        pending = -1  # Función cuyo cuerpo aún no abre con {
+        parameters_start = 0  # Los parámetros pertenecen al ámbito de la función
+        depth = 0
+        open_bodies = []  # (función, profundidad antes de su llave de apertura)
+        token_count = len(tokens)
+
+        for j, token in enumerate(tokens):
+            self.last_function.append(current)
+            if pending != -1 and j >= parameters_start:
+                self.enclosing_function.append(pending)
+            else:
+                self.enclosing_function.append(open_bodies[-1][0] if open_bodies else -1)
+
+            if token.type == 'FCTN' and j + 2 < token_count and tokens[j+2].type == 'IDEN':
+                self.functions.append({
+                    'name': tokens[j+2].value,
+                    'returnType': tokens[j+1].value if tokens[j+1].code in DATA_TYPE_CODES else None,
+                    'line': token.line,
+                })
+                current = pending = len(self.functions) - 1
+                parameters_start = j + 3
+            elif token.type == 'CH{':
+                if pending != -1:
+                    open_bodies.append((pending, depth))
+                    pending = -1
+                depth += 1
+            elif token.type == 'CH}':
+                depth -= 1
+                if open_bodies and open_bodies[-1][1] == depth:
+                    open_bodies.pop()
+
+    def function_before(self, index):
+        # Última función declarada antes del token (o None)
+        function = self.last_function[index]
+        return self.functions[function] if function != -1 else None
+
+# Pareja de cada paréntesis, llave y corchete, calculada en un solo recorrido con
+# una pila compartida. partner[i] es el índice del símbolo que cierra (o abre) al
+# token i, o -1 si el token no es un símbolo o no tiene pareja. Las llaves delimitan
+# sentencias: un paréntesis o corchete aún abierto al llegar a "{" o "}" queda sin
+# pareja, así que ninguna pareja cruza de una sentencia a otra.
+BRACKET_PAIRS = {'CH(': 'CH)', 'CH{': 'CH}', 'CH[': 'CH]'}
+CLOSING_BRACKETS = {closing: opening for opening, closing in BRACKET_PAIRS.items()}
+
+class BracketIndex:
+    def __init__(self, tokens):
+        self.partner = array('i', [-1]) * len(tokens)
+        self.unmatched = []  # Índices de símbolos sin pareja, en orden
+
+        stack = []  # Índices de los símbolos de apertura pendientes
+        unmatched = self.unmatched
+        for j, token in enumerate(tokens):
+            token_type = token.type
+            if token_type == 'CH(' or token_type == 'CH[':
+                stack.append(j)
+            elif token_type == 'CH{' or token_type == 'CH}':
+                # Cerrar la sentencia: los paréntesis y corchetes pendientes quedan sin pareja
+                while stack and tokens[stack[-1]].type != 'CH{':
+                    unmatched.append(stack.pop())
+                if token_type == 'CH{':
+                    stack.append(j)
+                elif stack:
+                    opening = stack.pop()
+                    self.partner[opening] = j
+                    self.partner[j] = opening
+                else:
+                    unmatched.append(j)
+            elif token_type in CLOSING_BRACKETS:
+                opening_type = CLOSING_BRACKETS[token_type]
+                top_type = tokens[stack[-1]].type if stack else None
+                if top_type == opening_type:
+                    opening = stack.pop()
+                    self.partner[opening] = j
+                    self.partner[j] = opening
+                else:
+                    # Cruzado con el símbolo más interno (p. ej. "[ )"): ninguno de los dos
+                    # tiene pareja. Una llave abierta no se descarta por un ")" suelto.
+                    if top_type is not None and top_type != 'CH{':
+                        unmatched.append(stack.pop())
+                    unmatched.append(j)
+        unmatched.extend(stack)
+        unmatched.sort()
+
+    def closing(self, index, tokens):
+        # Índice del cierre del paréntesis de apertura en `index` (-1 si no es "(" o no se cierra)
+        if index >= len(tokens) or tokens[index].type != 'CH(':
+            return -1
+        return self.partner[index]
+
+def lex_raw_lines(scan, text):
+    # Genera por cada línea los pares (tipo, valor) y los errores (tipo, mensaje),
+    # sin números de línea ni IDs de identificador: solo dependen del texto de la línea
+    pairs = []
+    raw_errors = []
+    last_end = 0
+
+    # Un solo recorrido sobre todo el texto; los saltos de línea cierran cada línea
+    for token_type, start, end in scan(text):
+        # El comentario se descarta; lo que quede en la línea se reporta al cerrarla
+        if token_type == "COMM":
+            continue
+
+        if token_type == "BRKLN":
+            report_trailing_text(text[last_end:start], raw_errors)
+            yield pairs, raw_errors
+            pairs = []
+            raw_errors = []
+            last_end = end
+            continue
+
+        if start > last_end:
+            unrecognized_text = text[last_end:start].strip()
+            if unrecognized_text:
+                raw_errors.append(('ERROR', f"Token o identificador inesperado: {unrecognized_text}"))
+        last_end = end
+        pairs.append((token_type, text[start:end]))
+
+    report_trailing_text(text[last_end:], raw_errors)
+    yield pairs, raw_errors
+
+def report_trailing_text(trailing_text, raw_errors):
+    # Texto sin reconocer al final de la línea (incluye el comentario, si lo hay)
+    unrecognized_text = trailing_text.strip()
+    if unrecognized_text:
+        raw_errors.append(('SYNTAX_ERROR', f"Texto no reconocido: {unrecognized_text}"))
+
+# Resultados de una línea que solo dependen de su texto; se comparten entre
+# peticiones a través de la caché de líneas
+# Las líneas con más tokens no se guardan en la caché de líneas: casi nunca se repiten
+# y sus tokens, prefija y tripletas crecen con la línea. Además, lo que sobrevive a una
+# petición grande queda disperso entre objetos temporales y retiene mucha más memoria
+# del proceso de la que ocupa.
+MAX_CACHED_LINE_TOKENS = 48
+# Estimación de memoria por entrada de la caché de líneas (medida con tracemalloc):
+# objeto y tuplas más, por token, el par (tipo, valor), su parte del árbol sintáctico
+# y de la expresión
+LINE_ENTRY_BASE_BYTES = 400
+LINE_ENTRY_TOKEN_BYTES = 160
+
+class LineAnalysis:
+    __slots__ = ("tokens", "errors", "syntax", "expression")
+
+    def __init__(self, tokens, errors):
+        self.tokens = tokens  # Pares (tipo, valor)
+        self.errors = errors  # Pares (tipo, mensaje)
+        self.syntax = None  # LineSyntax de parse_statements
+        self.expression = None  # Resultado de analyze_line_expression
+
+    def estimated_size(self, line_text):
+        # Bytes que ocupará la entrada en la caché de líneas, incluida la expresión
+        return LINE_ENTRY_BASE_BYTES + len(line_text) + LINE_ENTRY_TOKEN_BYTES * (len(self.tokens) + len(self.errors))
+
+def format_verdict(error, line_number):
+    # (válida, mensaje) de una línea a partir de su error de sintaxis (None si no hay)
+    if error is None:
+        return True, ''
+    return False, f"Error sintáctico en línea {line_number}: {error}"
+
+# Análisis por fragmentos de un texto grande. El código se copia una sola vez a
+# memoria compartida y cada proceso decodifica solo su rango de bytes, que siempre
+# empieza y termina en un salto de línea.
+def shard_bounds(data, shards):
+    bounds = []
+    start = 0
+    for shard in range(1, shards):
+        cut = data.find(b"\n", max(start, len(data) * shard // shards))
+        if cut == -1:
+            break
+        bounds.append((start, cut))
+        start = cut + 1
+    bounds.append((start, len(data)))
+    return bounds
+
+def attach_shared_memory(name):
+    # Quien solo lee el bloque no lo registra: lo libera el proceso que lo creó
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Antes de 3.13 no hay `track`: se omite el registro mientras se abre el bloque
+        # (el worker tiene un solo hilo)
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def lex_shard(job):
+    # Se ejecuta en los procesos del pool: LineAnalysis de cada línea del fragmento
+    memory_name, start, end, backend, expressions = job
+    memory = attach_shared_memory(memory_name)
+    view = memory.buf[start:end]
+    try:
+        text = str(view, "utf-8", "surrogatepass")
+    finally:
+        view.release()
+        memory.close()
+
+    entries = []
+    for pairs, raw_errors in lex_raw_lines(LEXER_BACKENDS[backend], text):
+        entry = LineAnalysis(tuple(pairs), tuple(raw_errors))
+        # El análisis sintáctico solo depende de tipos y valores: la línea no importa
+        entry.syntax = parse_statements([Token(token_type, value, 0) for token_type, value in pairs])
+        if expressions:
+            entry.expression = analyze_line_expression(entry.syntax) or {}
+        entries.append(entry)
+    return entries
+
+def lex_shards(text, pool, shards, backend="regex", expressions=True):
+    # Lista de LineAnalysis por fragmento, en orden; `pool` puede ser un
+    # ProcessPoolExecutor o un multiprocessing.Pool
+    data = text.encode("utf-8", "surrogatepass")  # el código puede traer surrogates sueltos
+    memory = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    try:
+        memory.buf[:len(data)] = data
+        jobs = [(memory.name, start, end, backend, expressions) for start, end in shard_bounds(data, shards)]
+        return list(pool.map(lex_shard, jobs))
+    finally:
+        memory.close()
+        memory.unlink()
+
 # Clase Lexer
 class Lexer:
-    def __init__(self, text):
-        self.text = text
-        self.tokens = []
-        self.errors = []
-        self.identifier_values = {}
-        self.identifier_counter = 1
-        self.identifier_map = {}
-        self.function_return_types = {}  # Para almacenar tipos de retorno de funciones
+    def __init__(self, text, backend="regex", line_cache=None):
+        if backend not in LEXER_BACKENDS:
+            raise ValueError(f"Backend de lexer desconocido: {backend}")
+        self._text = text
+        self._source_lines = None  # Líneas del código; se usan en lugar de _text tras editar
+        self.backend = backend
+        self._tokens = []
+        self._errors = []
+        self._stale_line = None  # Índice de la primera línea con números desactualizados
+        self.line_tokens = []  # Tokens de cada línea (índice = línea - 1)
+        self.line_errors = []  # Errores léxicos de cada línea
+        self.line_entries = []  # LineAnalysis de cada línea (None sin caché de líneas o si la línea es muy larga, hasta analizarla)
+        self.line_cache = line_cache
+        self._values = {}  # Cadenas de valores de tokens ya vistas
+        self._symbols = SymbolTable()
+        self._symbols_stale = False
+        self.rule_timings = {}  # Segundos por regla semántica
+        self._scope_index = None
+        self._bracket_index = None
+        self._program = None
+        self._syntax_errors = None
+
+    # Tras una edición incremental, el texto y las listas completas de tokens y errores
+    # se reconstruyen solo al consultarlos; la edición en sí solo toca las líneas editadas
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = "\n".join(self._source_lines)
+        return self._text
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._refresh_line_numbers()
+            self._tokens = list(chain.from_iterable(self.line_tokens))
+        return self._tokens
+
+    @property
+    def errors(self):
+        if self._errors is None:
+            self._refresh_line_numbers()
+            self._errors = list(chain.from_iterable(self.line_errors))
+        return self._errors
+
+    @errors.setter
+    def errors(self, errors):
+        self._errors = errors
+
+    def _refresh_line_numbers(self, first_line=1, last_line=None):
+        # Aplica a los tokens y errores léxicos de las líneas first_line..last_line los
+        # desplazamientos pendientes de las ediciones (por defecto, a todo el documento)
+        stale = self._stale_line
+        if stale is None:
+            return
+        line_count = len(self.line_tokens)
+        last_line = line_count if last_line is None else min(last_line, line_count)
+        for index in range(max(stale, first_line - 1), last_line):
+            line_number = index + 1
+            for token in self.line_tokens[index]:
+                token.line = line_number
+            for error in self.line_errors[index]:
+                error['line'] = line_number
+        if first_line - 1 <= stale and last_line == line_count:
+            self._stale_line = None
+
+    @property
+    def scope_index(self):
+        if self._scope_index is None:
+            self._scope_index = ScopeIndex(self.tokens)
+        return self._scope_index
+
+    @property
+    def symbols(self):
+        # Tras una edición incremental las apariciones se vuelven a registrar al consultarla
+        if self._symbols_stale:
+            self._refresh_line_numbers()
+            self._symbols.reset_occurrences()
+            last_token_type = None
+            first_index = 0
+            for tokens_line in self.line_tokens:
+                last_token_type = self._record_symbols(tokens_line, first_index, last_token_type)
+                first_index += len(tokens_line)
+            self._symbols_stale = False
+        return self._symbols
+
+    @property
+    def bracket_index(self):
+        if self._bracket_index is None:
+            self._bracket_index = BracketIndex(self.tokens)
+        return self._bracket_index
+
+    @property
+    def program(self):
+        # AST del programa: las sentencias de cada línea unidas en bloques
+        if self._program is None:
+            self._build_program()
+        return self._program
+
+    @property
+    def syntax_errors(self):
+        # Primer error de sintaxis de cada línea, propio o de estructura entre líneas
+        if self._program is None:
+            self._build_program()
+        return self._syntax_errors
+
+    def _build_program(self):
+        lines = ((line_number, self._line_analysis(line_number).syntax)
+                 for line_number in range(1, len(self.line_tokens) + 1))
+        self._program, self._syntax_errors = build_program(lines)
 
     def tokenize(self):
-        line_number = 1
-        last_token_type = None
-        for line in self.text.split("\n"):
-            tokens_line = []
-            last_end = 0
-            
-            # Primero verificar si hay un comentario en la línea
-            comment_match = re.search(r'//.*', line)
-            comment_start = len(line) if comment_match is None else comment_match.start()
-            
-            # Solo procesar la parte de la línea antes del comentario
-            line_to_process = line[:comment_start]
-            
-            for match in re.finditer("|".join(f"({pattern})" for pattern, _ in patterns), line_to_process):
-                start, end = match.span()
-                if start > last_end:
-                    unrecognized_text = line[last_end:start].strip()
-                    if unrecognized_text:
-                        self.errors.append({
-                            'line': line_number,
-                            'type': 'ERROR',
-                            'message': f"Token o identificador inesperado: {unrecognized_text}"
-                        })
-                last_end = end
-                for i, group in enumerate(match.groups()):
-                    if group is not None:
-                        token_type = patterns[i][1]
-                        if token_type == "IDEN":
-                            if group not in self.identifier_map:
-                                self.identifier_map[group] = self.identifier_counter
-                                self.identifier_counter += 1
-                            tokens_line.append({
-                                "type": "IDEN", 
-                                "id": self.identifier_map[group], 
-                                "value": group, 
-                                "line": line_number
-                            })
-                        else:
-                            tokens_line.append({"type": token_type, "value": group, "line": line_number})
-                        if token_type.startswith("TP"):
-                            last_token_type = group
-                        break
-
-            if last_end < len(line):
-                unrecognized_text = line[last_end:].strip()
-                if unrecognized_text:
-                    self.errors.append({
-                        'line': line_number,
-                        'type': 'SYNTAX_ERROR',
-                        'message': f"Texto no reconocido: {unrecognized_text}"
-                    })
+        for _ in self.iter_tokens():
+            pass
 
-            for i, token in enumerate(tokens_line):
-                if token["type"] == "IDEN":
-                    if last_token_type:
-                        self.identifier_values[token["value"]] = {
-                            "type": last_token_type,
-                            "value": None,
-                        }
-                        last_token_type = None
-                    if i + 2 < len(tokens_line) and tokens_line[i + 1]["type"] == "ASSGN":
-                        value_token = tokens_line[i + 2]
-                        if value_token["type"] in ["NUMINT", "STR", "IDEN", "NUMDB", "TRUE", "FALSE"]:
-                            if token["value"] in self.identifier_values:
-                                self.identifier_values[token["value"]]["value"] = value_token["value"]
-                            else:
-                                self.identifier_values[token["value"]] = {
-                                    "type": None,
-                                    "value": value_token["value"],
-                                }
+    def tokenize_sharded(self, pool, shards, expressions=True):
+        # Como tokenize(), pero el análisis de cada línea (tokens, errores léxicos, veredicto
+        # sintáctico y, con `expressions`, la expresión) se reparte en `shards` fragmentos
+        # entre los procesos de `pool`. Los fragmentos se unen en orden, así que los IDs de
+        # identificador y las pasadas entre líneas quedan igual que con tokenize().
+        entries = chain.from_iterable(lex_shards(self.text, pool, shards, self.backend, expressions))
+        for _ in self.iter_tokens(entries):
+            pass
 
+    def iter_tokens(self, entries=None):
+        # Genera (línea, tokens) a medida que se analiza cada línea; al agotarse,
+        # el lexer queda en el mismo estado que después de tokenize()
+        self._scope_index = None
+        self._bracket_index = None
+        self._program = None
+        last_token_type = None
+        for line_number, (tokens_line, errors_line, entry) in enumerate(self._lex_lines(self.text, entries=entries), 1):
+            last_token_type = self._record_symbols(tokens_line, len(self.tokens), last_token_type)
+            self.line_tokens.append(tokens_line)
+            self.line_errors.append(errors_line)
+            self.line_entries.append(entry)
             self.tokens.extend(tokens_line)
+            self.errors.extend(errors_line)
+            yield line_number, tokens_line
+
+    def _lex_lines(self, text, line_number=1, entries=None):
+        # Genera (tokens, errores, entrada de caché) por cada línea de `text`, numeradas desde `line_number`.
+        # `entries` son los LineAnalysis de las líneas si ya se analizaron en otro proceso
+        if entries is not None:
+            raw_lines = ((entry.tokens, entry.errors, entry) for entry in entries)
+        elif self.line_cache is None:
+            raw_lines = ((pairs, raw_errors, None) for pairs, raw_errors in lex_raw_lines(LEXER_BACKENDS[self.backend], text))
+        else:
+            raw_lines = self._cached_raw_lines(text)
+
+        values = self._values
+        intern = self._symbols.intern
+        for pairs, raw_errors, entry in raw_lines:
+            tokens_line = []
+            for token_type, value in pairs:
+                # Valores repetidos (identificadores, palabras reservadas) comparten la misma cadena
+                value = values.setdefault(value, value)
+                if token_type == "IDEN":
+                    tokens_line.append(Token("IDEN", value, line_number, intern(value).id))
+                else:
+                    tokens_line.append(Token(token_type, value, line_number))
+            errors_line = [{'line': line_number, 'type': error_type, 'message': message}
+                           for error_type, message in raw_errors]
+            yield tokens_line, errors_line, entry
             line_number += 1
 
+    def _cached_raw_lines(self, text):
+        # Las líneas ya vistas (en esta u otras peticiones) no se vuelven a analizar
+        scan = LEXER_BACKENDS[self.backend]
+        cache = self.line_cache
+        for line_text in text.split("\n"):
+            entry = cache.get(line_text)
+            if entry is None:
+                pairs, raw_errors = next(lex_raw_lines(scan, line_text))
+                if len(pairs) > MAX_CACHED_LINE_TOKENS:
+                    yield pairs, raw_errors, None
+                    continue
+                entry = LineAnalysis(tuple(pairs), tuple(raw_errors))
+                cache.put(line_text, entry, entry.estimated_size(line_text))
+            yield entry.tokens, entry.errors, entry
+
+    def _record_symbols(self, tokens_line, first_index, last_token_type):
+        # `first_index` es la posición en self.tokens del primer token de la línea.
+        # El último tipo declarado en la línea se asigna al primer identificador
+        for token in tokens_line:
+            if token.code in DATA_TYPE_CODES:
+                last_token_type = token.value
+
+        # Registrar apariciones, tipos y valores de los identificadores de la línea
+        symbols = self._symbols
+        for i, token in enumerate(tokens_line):
+            if token.type == "IDEN":
+                symbol = symbols.by_name[token.value]
+                symbols.add_occurrence(symbol, first_index + i, token.line)
+                if last_token_type:
+                    symbol.type = last_token_type
+                    symbol.value = None
+                    last_token_type = None
+                if i + 2 < len(tokens_line) and tokens_line[i + 1].type == "ASSGN":
+                    value_token = tokens_line[i + 2]
+                    if value_token.type in ["NUMINT", "STR", "IDEN", "NUMDB", "TRUE", "FALSE"]:
+                        symbol.value = value_token.value
+
+        return last_token_type
+
+    def apply_edit(self, start_line, end_line, new_text):
+        # Reemplaza las líneas start_line..end_line (inclusive) por new_text y
+        # vuelve a analizar solo esas líneas. end_line = start_line - 1 inserta sin borrar.
+        if not self.line_tokens:
+            self.tokenize()
+
+        line_count = len(self.line_tokens)
+        if not 1 <= start_line <= line_count + 1 or not start_line - 1 <= end_line <= line_count:
+            raise ValueError(f"Rango de líneas inválido: {start_line}-{end_line}")
+
+        new_lines = list(self._lex_lines(new_text, start_line))
+        removed_lines = end_line - start_line + 1
+        line_shift = len(new_lines) - removed_lines
+
+        # Las líneas posteriores a la edición se renumeran cuando se consultan
+        if line_shift:
+            first_stale = start_line - 1 + len(new_lines)
+            self._stale_line = first_stale if self._stale_line is None else min(self._stale_line, first_stale)
+
+        self.line_tokens[start_line - 1:end_line] = [tokens_line for tokens_line, _, _ in new_lines]
+        self.line_errors[start_line - 1:end_line] = [errors_line for _, errors_line, _ in new_lines]
+        self.line_entries[start_line - 1:end_line] = [entry for _, _, entry in new_lines]
+
+        if self._source_lines is None:
+            self._source_lines = self._text.split("\n")
+        self._source_lines[start_line - 1:end_line] = new_text.split("\n")
+        self._text = None
+        self._tokens = None
+        self._errors = None
+        self._symbols_stale = True
+        self._scope_index = None
+        self._bracket_index = None
+        self._program = None
+
+        return {
+            'startLine': start_line,
+            'removedLines': removed_lines,
+            'lineShift': line_shift,
+            'lineCount': len(self.line_tokens),
+            'lines': self.get_line_results(start_line, start_line + len(new_lines) - 1),
+        }
+
+    def get_line_results(self, start_line, end_line):
+        # Tokens, errores léxicos y resultado sintáctico de un rango de líneas
+        self._refresh_line_numbers(start_line, end_line)
+        results = []
+        for line_number in range(start_line, end_line + 1):
+            tokens_line = self.line_tokens[line_number - 1]
+            is_valid, message = self.line_syntax(line_number)
+            results.append({
+                'line': line_number,
+                'tokens': [token.to_dict() for token in tokens_line],
+                'errors': self.line_errors[line_number - 1],
+                'valid': is_valid,
+                'message': message
+            })
+        return results
+
     def get_tokens(self):
         return self.tokens
 
+    def get_line_tokens(self, line_number):
+        # Índice por línea construido durante tokenize()
+        if 1 <= line_number <= len(self.line_tokens):
+            self._refresh_line_numbers(line_number, line_number)
+            return self.line_tokens[line_number - 1]
+        return []
+
     def get_identifiers_info(self):
-        last_identifiers = {}
-        for token in self.tokens:
-            if token["type"] == "IDEN" and token["value"] in self.identifier_values:
-                identifier_info = self.identifier_values[token["value"]]
-                identifier_info["line"] = token["line"]
-                last_identifiers[token["value"]] = {
-                    "line": identifier_info["line"],
-                    "type": identifier_info["type"],
-                    "name": token["value"],
-                    "value": identifier_info["value"],
-                }
-        return list(last_identifiers.values())
-
-    def detect_errors(self):
-        errors = []
-        
-        # Verificar operadores no válidos
-        for i, token in enumerate(self.tokens):
-            # Ignorar tokens de comentarios
-            if token['type'] == 'COMM':
-                continue
-            
-            # Detectar operadores no soportados de forma individual
-            if token['type'] == 'AOP%':
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_OPERATOR',
-                    'message': f"Operador {token['value']} no soportado",
-                })
-            elif token['type'] == 'AOP++':
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_OPERATOR',
-                    'message': f"Operador {token['value']} no soportado",
-                })
-            elif token['type'] == 'AOP--':
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_OPERATOR',
-                    'message': f"Operador {token['value']} no soportado",
-                })
-            elif token['type'] == 'AOPASSGN':
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_OPERATOR',
-                    'message': f"Operador {token['value']} no soportado",
-                })
-            
-            # Verificar operaciones aritméticas con tipos incompatibles
-            if token['type'].startswith('AOP') and i > 0 and i + 1 < len(self.tokens):
-                left_operand = self.tokens[i-1]
-                right_operand = self.tokens[i+1]
-                
-                left_type = None
-                right_type = None
-                
-                # Determinar tipo del operando izquierdo
-                if left_operand['type'] == 'NUMINT':
-                    left_type = 'entero'
-                elif left_operand['type'] == 'NUMDB':
-                    left_type = 'decimal'
-                elif left_operand['type'] == 'STR':
-                    left_type = 'cadena'
-                elif left_operand['type'] == 'IDEN':
-                    var_name = left_operand['value']
-                    if var_name in self.identifier_values and self.identifier_values[var_name]['type']:
-                        left_type = normalize_type(self.identifier_values[var_name]['type'])
-                
-                # Determinar tipo del operando derecho
-                if right_operand['type'] == 'NUMINT':
-                    right_type = 'entero'
-                elif right_operand['type'] == 'NUMDB':
-                    right_type = 'decimal'
-                elif right_operand['type'] == 'STR':
-                    right_type = 'cadena'
-                elif right_operand['type'] == 'IDEN':
-                    var_name = right_operand['value']
-                    if var_name in self.identifier_values and self.identifier_values[var_name]['type']:
-                        right_type = normalize_type(self.identifier_values[var_name]['type'])
-                
-                # Verificar compatibilidad de tipos
-                if left_type and right_type and not are_types_compatible(left_type, right_type):
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'TYPE_MISMATCH',
-                        'message': f"Tipos incompatibles en operación aritmética: '{left_type}' {token['value']} '{right_type}'",
-                    })
-        
-        # Verificar asignaciones a variables
+        # Identificadores declarados o asignados, en orden de primera aparición, con la
+        # primera y la última línea en que aparecen y el número de apariciones
+        return [symbol.to_dict() for symbol in self.symbols.order if symbol.tracked]
+
+    def detect_errors(self, profile=False):
+        # Tipos normalizados de las variables declaradas, compartidos por todas las reglas
+        identifier_types = self.symbols.identifier_types()
+        rules = [rule_class(self, identifier_types) for rule_class in SEMANTIC_RULES]
+        self.rule_timings = {rule.name: 0.0 for rule in rules}
+
+        # Tabla de despacho: código de token -> reglas interesadas en ese tipo
+        dispatch = [[] for _ in TOKEN_CODES]
+        for rule in rules:
+            visit = self._timed(rule.name, rule.visit) if profile else rule.visit
+            for token_type in (rule.token_types if rule.token_types is not None else TOKEN_CODES):
+                dispatch[TOKEN_CODES[token_type]].append(visit)
+
+        # Un solo recorrido del flujo de tokens
         for i, token in enumerate(self.tokens):
-            if token['type'] == 'IDEN' and i + 1 < len(self.tokens) and self.tokens[i + 1]['type'] == 'ASSGN':
-                var_name = token['value']
-                
-                # Buscar el tipo de la variable
-                var_type = None
-                if var_name in self.identifier_values and self.identifier_values[var_name]['type']:
-                    var_type = normalize_type(self.identifier_values[var_name]['type'])
-                
-                # Verificar tipo de asignación
-                if var_type and i + 2 < len(self.tokens):
-                    value_token = self.tokens[i + 2]
-                    value_type = None
-                    
-                    # Determinar tipo del valor asignado
-                    if value_token['type'] == 'NUMINT':
-                        value_type = 'entero'
-                    elif value_token['type'] == 'NUMDB':
-                        value_type = 'decimal'
-                    elif value_token['type'] == 'STR':
-                        value_type = 'cadena'
-                    elif value_token['type'] == 'IDEN':
-                        other_var = value_token['value']
-                        if other_var in self.identifier_values and self.identifier_values[other_var]['type']:
-                            value_type = normalize_type(self.identifier_values[other_var]['type'])
-                    
-                    # Verificar compatibilidad de tipos
-                    if var_type and value_type and not are_types_compatible(var_type, value_type):
-                        errors.append({
-                            'line': token['line'],
-                            'type': 'TYPE_MISMATCH',
-                            'message': f"Tipo incompatible: variable '{var_name}' es de tipo '{var_type}' pero se le asigna un valor de tipo '{value_type}'",
-                        })
-        
-        # Verificar variables y otros errores
-        for token in self.tokens:
-            # Ignorar tokens de comentarios
-            if token['type'] == 'COMM':
-                continue
-            
-            if token['type'] == 'IDEN' and not token['value'].startswith('_'):
-                # Verificar si ya existe un error para esta variable en esta línea
-                existing_error = any(
-                    e['type'] == 'INVALID_IDEN' and 
-                    e['line'] == token['line'] and 
-                    e.get('variable') == token['value'] 
-                    for e in errors
-                )
-            
-                if not existing_error:
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'INVALID_IDEN',
-                        'message': error_messages['INVALID_IDEN'],
-                        'variable': token['value']
-                    })
-            elif token['type'] not in valid_keywords and token['type'] != 'IDEN':
-                if re.match(r'^[a-zA-Z_]\w*$', token['value']) and token['value'] not in valid_keywords:
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'INVALID_KEYWORD',
-                        'message': error_messages['INVALID_KEYWORD']
-                    })
-            elif token['type'] == 'NUMINT' and re.search(r'[a-zA-Z]', token['value']):
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_NUMINT',
-                    'message': error_messages['INVALID_NUMINT']
-                })
-            elif token['type'] == 'NUMDB' and re.search(r'[a-zA-Z]', token['value']):
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_NUMDB',
-                    'message': error_messages['INVALID_NUMDB']
-                })
-            elif token['type'].startswith('AOP') and re.search(r'[^\+\-\*/]', token['value']):
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_OPERATOR',
-                    'message': error_messages['INVALID_OPERATOR']
-                })
-            elif token['type'] == 'STR' and re.search(r'\b(try|input|output|clear|int|string|double|catch|if|else|elseif|for|while|do|continue|return|function)\b', token['value']):
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_STRING',
-                    'message': error_messages['INVALID_STRING']
-                })
-            elif token['type'] == 'COMM' and not re.match(r'//.*', token['value']):
-                errors.append({
-                    'line': token['line'],
-                    'type': 'INVALID_COMMENT',
-                    'message': error_messages['INVALID_COMMENT']
-                })
+            for visit in dispatch[token.code]:
+                visit(i, token)
 
-        # Verificar estructuras de control incompletas
-        i = 0
-        while i < len(self.tokens):
-            token = self.tokens[i]
-            
-            # Verificar estructura IF
-            if token['type'] == 'IF':
-                # Verificar si hay una condición completa
-                if i + 3 >= len(self.tokens) or self.tokens[i+1]['type'] != 'CH(' or 'CH)' not in [t['type'] for t in self.tokens[i+1:i+10]]:
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'INCOMPLETE_CONDITION',
-                        'message': "Condición incompleta en estructura IF"
-                    })
-            
-            # Verificar estructura FOR
-            elif token['type'] == 'FOR':
-                # Verificar si tiene los tres componentes: inicialización, condición, incremento
-                if i + 5 >= len(self.tokens) or self.tokens[i+1]['type'] != 'CH(' or 'CH)' not in [t['type'] for t in self.tokens[i+1:i+20]]:
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'INCOMPLETE_CONDITION',
-                        'message': "Estructura FOR incompleta (debe tener inicialización, condición e incremento)"
-                    })
-                else:
-                    # Buscar los dos puntos y coma que separan las tres partes
-                    semicolons = 0
-                    for j in range(i+2, i+20):
-                        if j < len(self.tokens) and self.tokens[j]['type'] == 'CH;':
-                            semicolons += 1
-                    
-                    if semicolons < 2:
-                        errors.append({
-                            'line': token['line'],
-                            'type': 'INCOMPLETE_CONDITION',
-                            'message': "Estructura FOR incompleta (faltan componentes)"
-                        })
-            
-            # Verificar estructura WHILE
-            elif token['type'] == 'WHI':
-                if i + 3 >= len(self.tokens) or self.tokens[i+1]['type'] != 'CH(' or 'CH)' not in [t['type'] for t in self.tokens[i+1:i+10]]:
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'INCOMPLETE_CONDITION',
-                        'message': "Condición incompleta en estructura WHILE"
-                    })
-            
-            # Verificar funciones con retorno
-            elif token['type'] == 'FCTN' and i + 3 < len(self.tokens):
-                # Verificar si la función tiene tipo de retorno
-                if self.tokens[i+1]['type'].startswith('TP'):
-                    return_type = self.tokens[i+1]['value']
-                    if i + 2 < len(self.tokens) and self.tokens[i+2]['type'] == 'IDEN':
-                        function_name = self.tokens[i+2]['value']
-                        self.function_return_types[function_name] = return_type
-                
-                # Verificar si hay paréntesis para los parámetros
-                if i + 4 >= len(self.tokens) or self.tokens[i+3]['type'] != 'CH(' or 'CH)' not in [t['type'] for t in self.tokens[i+3:i+15]]:
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'SYNTAX_ERROR',
-                        'message': "Declaración de función incompleta (faltan paréntesis para parámetros)"
-                    })
-            
-            # Verificar instrucciones RETURN
-            elif token['type'] == 'RTRN' and i + 1 < len(self.tokens):
-                # Buscar en qué función estamos
-                current_function = None
-                current_function_type = None
-                
-                # Buscar hacia atrás para encontrar la función actual
-                for j in range(i-1, -1, -1):
-                    if self.tokens[j]['type'] == 'FCTN' and j + 2 < len(self.tokens) and self.tokens[j+2]['type'] == 'IDEN':
-                        current_function = self.tokens[j+2]['value']
-                        if self.tokens[j+1]['type'].startswith('TP'):
-                            current_function_type = self.tokens[j+1]['value']
-                        break
-                
-                # Verificar si el tipo de retorno coincide con el tipo de la función
-                if current_function and current_function_type:
-                    return_value_token = self.tokens[i+1]
-                    return_value_type = None
-                    
-                    if return_value_token['type'] == 'NUMINT':
-                        return_value_type = 'entero'
-                    elif return_value_token['type'] == 'NUMDB':
-                        return_value_type = 'decimal'
-                    elif return_value_token['type'] == 'STR':
-                        return_value_type = 'cadena'
-                    elif return_value_token['type'] == 'TRUE' or return_value_token['type'] == 'FALSE':
-                        return_value_type = 'booleano'
-                    elif return_value_token['type'] == 'IDEN':
-                        # Buscar el tipo de la variable
-                        var_name = return_value_token['value']
-                        if var_name in self.identifier_values and self.identifier_values[var_name]['type']:
-                            return_value_type = normalize_type(self.identifier_values[var_name]['type'])
-                    
-                    if return_value_type and not are_types_compatible(normalize_type(current_function_type), return_value_type):
-                        errors.append({
-                            'line': token['line'],
-                            'type': 'FUNCTION_RETURN_TYPE_MISMATCH',
-                            'message': f"Tipo de retorno '{return_value_type}' incompatible con el tipo de función '{normalize_type(current_function_type)}'"
-                        })
-            
-            # Verificar funciones output e input
-            elif token['type'] == 'OUT':
-                # Verificar si hay paréntesis de apertura
-                if i + 1 >= len(self.tokens) or self.tokens[i+1]['type'] != 'CH(':
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'INCOMPLETE_OUTPUT',
-                        'message': "Función output incompleta (falta paréntesis de apertura)"
-                    })
-                else:
-                    # Verificar si hay paréntesis de cierre
-                    has_closing_paren = False
-                    has_string = False
-                    for j in range(i+2, min(i+10, len(self.tokens))):
-                        if self.tokens[j]['type'] == 'CH)':
-                            has_closing_paren = True
-                            break
-                        if self.tokens[j]['type'] == 'STR':
-                            has_string = True
-                    
-                    if not has_closing_paren:
-                        errors.append({
-                            'line': token['line'],
-                            'type': 'INCOMPLETE_OUTPUT',
-                            'message': "Función output incompleta (falta paréntesis de cierre)"
-                        })
-                    elif not has_string and i + 2 < len(self.tokens) and self.tokens[i+2]['type'] != 'STR' and self.tokens[i+2]['type'] != 'IDEN':
-                        errors.append({
-                            'line': token['line'],
-                            'type': 'INCOMPLETE_OUTPUT',
-                            'message': "Función output debe recibir una cadena o variable"
-                        })
-            
-            elif token['type'] == 'INP':
-                # Verificar si hay paréntesis de apertura
-                if i + 1 >= len(self.tokens) or self.tokens[i+1]['type'] != 'CH(':
-                    errors.append({
-                        'line': token['line'],
-                        'type': 'INCOMPLETE_INPUT',
-                        'message': "Función input incompleta (falta paréntesis de apertura)"
-                    })
-                else:
-                    # Verificar si hay paréntesis de cierre
-                    has_closing_paren = False
-                    for j in range(i+2, min(i+10, len(self.tokens))):
-                        if self.tokens[j]['type'] == 'CH)':
-                            has_closing_paren = True
-                            break
-                    
-                    if not has_closing_paren:
-                        errors.append({
-                            'line': token['line'],
-                            'type': 'INCOMPLETE_INPUT',
-                            'message': "Función input incompleta (falta paréntesis de cierre)"
-                        })
-            
-            i += 1
+        # Los errores se combinan en el orden de registro de las reglas
+        errors = ErrorCollection()
+        for rule in rules:
+            finish = self._timed(rule.name, rule.finish) if profile else rule.finish
+            finish()
+            for error in rule.errors:
+                errors.add(error)
 
-        # Verificar equilibrio de símbolos
-        symbol_counts = {
-            'llave': {'open': 0, 'close': 0},
-            'paréntesis': {'open': 0, 'close': 0},
-            'corchete': {'open': 0, 'close': 0}
-        }
-        
-        for token in self.tokens:
-            if token['type'] == 'CH{':
-                symbol_counts['llave']['open'] += 1
-            elif token['type'] == 'CH}':
-                symbol_counts['llave']['close'] += 1
-            elif token['type'] == 'CH(':
-                symbol_counts['paréntesis']['open'] += 1
-            elif token['type'] == 'CH)':
-                symbol_counts['paréntesis']['close'] += 1
-            elif token['type'] == 'CH[':
-                symbol_counts['corchete']['open'] += 1
-            elif token['type'] == 'CH]':
-                symbol_counts['corchete']['close'] += 1
-        
-        for symbol, counts in symbol_counts.items():
-            if counts['open'] != counts['close']:
-                errors.append({
-                    'line': 0,  # Error global
-                    'type': 'SYMBOL_IMBALANCE',
-                    'message': f"Desequilibrio de {symbol}s: {counts['open']} abiertos, {counts['close']} cerrados"
-                })
+        self.errors = errors.to_list()
+        return self.errors
 
-        # Eliminar errores duplicados
-        unique_errors = []
-        for error in errors:
-            if not any(
-                e['type'] == error['type'] and 
-                e['line'] == error['line'] and 
-                e.get('variable') == error.get('variable') and
-                e.get('message') == error.get('message')
-                for e in unique_errors
-            ):
-                unique_errors.append(error)
-
-        self.errors = unique_errors
-        return unique_errors
+    def _timed(self, name, method):
+        timings = self.rule_timings
+        def timed(*args):
+            start = time.perf_counter()
+            method(*args)
+            timings[name] += time.perf_counter() - start
+        return timed
+
+    def get_scopes(self):
+        # Ámbito global y uno por función, con los identificadores usados en cada uno
+        scope_index = self.scope_index
+        scopes = [{'function': None, 'returnType': None, 'line': None, 'symbols': []}]
+        for function in scope_index.functions:
+            scopes.append({
+                'function': function['name'],
+                'returnType': function['returnType'],
+                'line': function['line'],
+                'symbols': []
+            })
+
+        seen = set()
+        for i, token in enumerate(self.tokens):
+            if token.type == 'IDEN':
+                scope = scope_index.enclosing_function[i] + 1
+                if (scope, token.value) not in seen:
+                    seen.add((scope, token.value))
+                    scopes[scope]['symbols'].append(token.value)
+        return scopes
 
     def check_syntax(self):
         syntax_results = []
-        code_lines = self.text.split('\n')
+        line_count = self.text.count('\n') + 1
         
-        for line_number in range(1, len(code_lines) + 1):
-            line_tokens = [token for token in self.tokens if token['line'] == line_number]
-            is_valid, message = self.parse_line(line_tokens, line_number)
+        for line_number in range(1, line_count + 1):
+            is_valid, message = self.line_syntax(line_number)
             syntax_results.append({
                 'line': line_number,
                 'valid': is_valid,
@@ -612,87 +896,336 @@ class Lexer:
         
         return syntax_results
 
+    def line_syntax(self, line_number):
+        # Resultado sintáctico de una línea dentro del programa
+        if not 1 <= line_number <= len(self.line_tokens):
+            return True, ''
+        return format_verdict(self.syntax_errors.get(line_number), line_number)
+
+    def _line_analysis(self, line_number):
+        # LineAnalysis de la línea con su análisis sintáctico. Las líneas fuera de la
+        # caché reciben una entrada propia que solo dura lo que este lexer
+        entry = self.line_entries[line_number - 1]
+        if entry is None:
+            entry = self.line_entries[line_number - 1] = LineAnalysis(None, None)
+        if entry.syntax is None:
+            entry.syntax = parse_statements(self.line_tokens[line_number - 1])
+        return entry
+
+    def line_expression(self, line_number):
+        # Expresión, prefija y tripletas de una línea con asignación (None si no hay)
+        entry = self._line_analysis(line_number)
+        if entry.expression is None:
+            entry.expression = analyze_line_expression(entry.syntax) or {}
+        return entry.expression or None
+
+    def line_expression_error(self, line_number):
+        # Solo el error de la expresión de la línea (sin prefija ni tripletas)
+        entry = self._line_analysis(line_number)
+        if entry.expression is not None:
+            return entry.expression.get('error')
+        result = analyze_line_expression(entry.syntax, errors_only=True)
+        return result['error'] if result else None
+
     def parse_line(self, tokens, line_number):
-        if not tokens:
-            return True, ''  # Línea vacía es válida
+        # Resultado sintáctico de una línea suelta, sin la estructura del resto del programa
+        return format_verdict(parse_statements(tokens).error, line_number)
 
-        # Convertir tokens a tipos
-        token_types = [token['type'] for token in tokens]
-        token_values = [token['value'] for token in tokens]
+# Reglas del análisis semántico. Cada regla declara los tipos de token que le
+# interesan y recibe el flujo de tokens en un solo recorrido desde detect_errors.
+SEMANTIC_RULES = []
 
-        # Validación básica de estructuras comunes
-        try:
-            # Declaración de variable
-            if token_types[0] in ['TPINT', 'TPSTR', 'TPDBL']:
-                if len(token_types) >= 2 and token_types[1] == 'IDEN':
-                    return True, ''
+def semantic_rule(rule_class):
+    SEMANTIC_RULES.append(rule_class)
+    return rule_class
+
+# Tipos de las constantes literales
+LITERAL_TYPES = {
+    'NUMINT': 'entero',
+    'NUMDB': 'decimal',
+    'STR': 'cadena',
+}
+
+class SemanticRule:
+    name = ''
+    token_types = None  # None: la regla recibe todos los tokens
+
+    def __init__(self, lexer, identifier_types):
+        self.lexer = lexer
+        self.tokens = lexer.tokens
+        self.identifier_types = identifier_types
+        self.errors = []
+
+    def operand_type(self, token):
+        # Tipo de una constante o de una variable declarada (None si se desconoce)
+        if token.type == 'IDEN':
+            return self.identifier_types.get(token.value)
+        return LITERAL_TYPES.get(token.type)
+
+    def visit(self, i, token):
+        pass
+
+    def finish(self):
+        pass
+
+@semantic_rule
+class OperatorRule(SemanticRule):
+    # Operadores no soportados y operaciones aritméticas con tipos incompatibles
+    name = 'operadores'
+    token_types = [token_type for token_type in TOKEN_CODES if token_type.startswith('AOP')]
+
+    def visit(self, i, token):
+        tokens = self.tokens
+
+        # Detectar operadores no soportados de forma individual
+        if token.type in ('AOP%', 'AOP++', 'AOP--', 'AOPASSGN'):
+            self.errors.append({
+                'line': token.line,
+                'type': 'INVALID_OPERATOR',
+                'message': f"Operador {token.value} no soportado",
+            })
+
+        # Verificar operaciones aritméticas con tipos incompatibles
+        if i > 0 and i + 1 < len(tokens):
+            left_type = self.operand_type(tokens[i-1])
+            right_type = self.operand_type(tokens[i+1])
+            if left_type and right_type and not are_types_compatible(left_type, right_type):
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'TYPE_MISMATCH',
+                    'message': f"Tipos incompatibles en operación aritmética: '{left_type}' {token.value} '{right_type}'",
+                })
+
+@semantic_rule
+class AssignmentRule(SemanticRule):
+    # Asignaciones de un valor de tipo incompatible con la variable
+    name = 'asignaciones'
+    token_types = ['IDEN']
+
+    def visit(self, i, token):
+        tokens = self.tokens
+        if i + 2 < len(tokens) and tokens[i + 1].type == 'ASSGN':
+            var_name = token.value
+            var_type = self.identifier_types.get(var_name)
+            value_type = self.operand_type(tokens[i + 2])
+            if var_type and value_type and not are_types_compatible(var_type, value_type):
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'TYPE_MISMATCH',
+                    'message': f"Tipo incompatible: variable '{var_name}' es de tipo '{var_type}' pero se le asigna un valor de tipo '{value_type}'",
+                })
+
+@semantic_rule
+class LexicalRule(SemanticRule):
+    # Identificadores, palabras reservadas y constantes no válidas
+    name = 'identificadores'
+
+    def visit(self, i, token):
+        # Ignorar tokens de comentarios
+        if token.type == 'COMM':
+            return
+
+        if token.type == 'IDEN' and not token.value.startswith('_'):
+            self.errors.append({
+                'line': token.line,
+                'type': 'INVALID_IDEN',
+                'message': error_messages['INVALID_IDEN'],
+                'variable': token.value
+            })
+        elif token.type not in valid_keywords and token.type != 'IDEN':
+            if re.match(r'^[a-zA-Z_]\w*$', token.value) and token.value not in valid_keywords:
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'INVALID_KEYWORD',
+                    'message': error_messages['INVALID_KEYWORD']
+                })
+        elif token.type == 'NUMINT' and re.search(r'[a-zA-Z]', token.value):
+            self.errors.append({
+                'line': token.line,
+                'type': 'INVALID_NUMINT',
+                'message': error_messages['INVALID_NUMINT']
+            })
+        elif token.type == 'NUMDB' and re.search(r'[a-zA-Z]', token.value):
+            self.errors.append({
+                'line': token.line,
+                'type': 'INVALID_NUMDB',
+                'message': error_messages['INVALID_NUMDB']
+            })
+        elif token.code in ARITHMETIC_CODES and re.search(r'[^\+\-\*/]', token.value):
+            self.errors.append({
+                'line': token.line,
+                'type': 'INVALID_OPERATOR',
+                'message': error_messages['INVALID_OPERATOR']
+            })
+        elif token.type == 'STR' and re.search(r'\b(try|input|output|clear|int|string|double|catch|if|else|elseif|for|while|do|continue|return|function)\b', token.value):
+            self.errors.append({
+                'line': token.line,
+                'type': 'INVALID_STRING',
+                'message': error_messages['INVALID_STRING']
+            })
+        elif token.type == 'COMM' and not re.match(r'//.*', token.value):
+            self.errors.append({
+                'line': token.line,
+                'type': 'INVALID_COMMENT',
+                'message': error_messages['INVALID_COMMENT']
+            })
+
+@semantic_rule
+class ControlStructureRule(SemanticRule):
+    # Estructuras de control, funciones, return, output e input incompletos
+    name = 'estructuras'
+    token_types = ['IF', 'FOR', 'WHI', 'FCTN', 'RTRN', 'OUT', 'INP']
+
+    def __init__(self, lexer, identifier_types):
+        super().__init__(lexer, identifier_types)
+        self.bracket_index = lexer.bracket_index
+
+    def visit(self, i, token):
+        tokens = self.tokens
+        # Paréntesis de cierre del "(" que sigue a la palabra reservada (-1 si falta)
+        closing = self.bracket_index.closing
+
+        # Verificar estructura IF
+        if token.type == 'IF':
+            # Verificar si hay una condición completa
+            if closing(i + 1, tokens) == -1:
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'INCOMPLETE_CONDITION',
+                    'message': "Condición incompleta en estructura IF"
+                })
+
+        # Verificar estructura FOR
+        elif token.type == 'FOR':
+            # Verificar si tiene los tres componentes: inicialización, condición, incremento
+            end = closing(i + 1, tokens)
+            if end == -1:
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'INCOMPLETE_CONDITION',
+                    'message': "Estructura FOR incompleta (debe tener inicialización, condición e incremento)"
+                })
+            else:
+                # Buscar los dos puntos y coma que separan las tres partes
+                semicolons = 0
+                for j in range(i+2, end):
+                    if tokens[j].type == 'CH;':
+                        semicolons += 1
+
+                if semicolons < 2:
+                    self.errors.append({
+                        'line': token.line,
+                        'type': 'INCOMPLETE_CONDITION',
+                        'message': "Estructura FOR incompleta (faltan componentes)"
+                    })
+
+        # Verificar estructura WHILE
+        elif token.type == 'WHI':
+            if closing(i + 1, tokens) == -1:
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'INCOMPLETE_CONDITION',
+                    'message': "Condición incompleta en estructura WHILE"
+                })
+
+        # Verificar funciones con retorno
+        elif token.type == 'FCTN' and i + 3 < len(tokens):
+            # Verificar si hay paréntesis para los parámetros
+            if closing(i + 3, tokens) == -1:
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'SYNTAX_ERROR',
+                    'message': "Declaración de función incompleta (faltan paréntesis para parámetros)"
+                })
+
+        # Verificar instrucciones RETURN
+        elif token.type == 'RTRN' and i + 1 < len(tokens):
+            # Última función declarada antes del return (índice de ámbitos)
+            function = self.lexer.scope_index.function_before(i)
+            current_function = function['name'] if function else None
+            current_function_type = function['returnType'] if function else None
+
+            # Verificar si el tipo de retorno coincide con el tipo de la función
+            if current_function and current_function_type:
+                return_value_token = tokens[i+1]
+                if return_value_token.type == 'TRUE' or return_value_token.type == 'FALSE':
+                    return_value_type = 'booleano'
                 else:
-                    return False, 'Error en declaración de variable'
+                    return_value_type = self.operand_type(return_value_token)
+
+                if return_value_type and not are_types_compatible(normalize_type(current_function_type), return_value_type):
+                    self.errors.append({
+                        'line': token.line,
+                        'type': 'FUNCTION_RETURN_TYPE_MISMATCH',
+                        'message': f"Tipo de retorno '{return_value_type}' incompatible con el tipo de función '{normalize_type(current_function_type)}'"
+                    })
 
-            # Asignación
-            if len(token_types) >= 3 and token_types[0] == 'IDEN' and token_types[1] == 'ASSGN':
-                return True, ''
+        # Verificar funciones output e input
+        elif token.type == 'OUT':
+            # Verificar si hay paréntesis de apertura
+            if i + 1 >= len(tokens) or tokens[i+1].type != 'CH(':
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'INCOMPLETE_OUTPUT',
+                    'message': "Función output incompleta (falta paréntesis de apertura)"
+                })
+            else:
+                # Verificar si hay paréntesis de cierre
+                end = closing(i + 1, tokens)
 
-            # Estructura if
-            if len(token_types) >= 3 and token_types[0] == 'IF':
-                return True, ''
-            
-            # Estructura else
-            if len(token_types) >= 1 and token_types[0] == 'ELSE':
-                return True, ''
-            
-            # Estructura for
-            if len(token_types) >= 3 and token_types[0] == 'FOR':
-                return True, ''
+                if end == -1:
+                    self.errors.append({
+                        'line': token.line,
+                        'type': 'INCOMPLETE_OUTPUT',
+                        'message': "Función output incompleta (falta paréntesis de cierre)"
+                    })
+                elif tokens[i+2].type != 'STR' and tokens[i+2].type != 'IDEN' and not any(tokens[j].type == 'STR' for j in range(i+3, end)):
+                    self.errors.append({
+                        'line': token.line,
+                        'type': 'INCOMPLETE_OUTPUT',
+                        'message': "Función output debe recibir una cadena o variable"
+                    })
 
-            # Estructura while
-            if len(token_types) >= 3 and token_types[0] == 'WHI':
-                return True, ''
-            
-            # Estructura do
-            if len(token_types) >= 1 and token_types[0] == 'DO':
-                return True, ''
-            
-            # Estructura do-while (cierre)
-            if len(token_types) >= 3 and token_types[0] == 'CH}' and token_types[1] == 'WHI':
-                return True, ''
-
-            # Función output
-            if len(token_types) >= 3 and token_types[0] == 'OUT':
-                return True, ''
-                
-            # Función input
-            if len(token_types) >= 3 and token_types[0] == 'INP':
-                return True, ''
-
-            # Función con retorno de valor
-            if len(token_types) >= 3 and token_types[0] == 'FCTN':
-                return True, ''
-            
-            # Return statement
-            if len(token_types) >= 2 and token_types[0] == 'RTRN':
-                return True, ''
-
-            # Bloque vacío o cierre de bloque
-            if len(token_types) == 1 and (token_types[0] == 'CH}' or token_types[0] == 'CH{'):
-                return True, ''
-                
-            # Cierre de bloque con else
-            if len(token_types) >= 2 and token_types[0] == 'CH}' and token_types[1] == 'ELSE':
-                return True, ''
-                
-            # Cierre de bloque con else if
-            if len(token_types) >= 3 and token_types[0] == 'CH}' and token_types[1] == 'ELSE' and token_types[2] == 'IF':
-                return True, ''
-                
-            # Cierre de bloque general (cualquier token después de llave de cierre)
-            if len(token_types) >= 1 and token_types[0] == 'CH}':
-                return True, ''
-
-        except IndexError:
-            return False, f"Error sintáctico en línea {line_number}: Estructura incompleta"
-
-        return False, f"Error sintáctico en línea {line_number}: Estructura no reconocida"
+        elif token.type == 'INP':
+            # Verificar si hay paréntesis de apertura
+            if i + 1 >= len(tokens) or tokens[i+1].type != 'CH(':
+                self.errors.append({
+                    'line': token.line,
+                    'type': 'INCOMPLETE_INPUT',
+                    'message': "Función input incompleta (falta paréntesis de apertura)"
+                })
+            else:
+                # Verificar si hay paréntesis de cierre
+                if closing(i + 1, tokens) == -1:
+                    self.errors.append({
+                        'line': token.line,
+                        'type': 'INCOMPLETE_INPUT',
+                        'message': "Función input incompleta (falta paréntesis de cierre)"
+                    })
+
+@semantic_rule
+class SymbolBalanceRule(SemanticRule):
+    # Llaves, paréntesis y corchetes sin pareja, en la línea del símbolo
+    name = 'símbolos'
+    token_types = []  # Usa el índice de parejas en lugar de recorrer los tokens
+    symbols = {
+        'CH{': ('Llave', 'sin cerrar'),
+        'CH}': ('Llave', 'sin abrir'),
+        'CH(': ('Paréntesis', 'sin cerrar'),
+        'CH)': ('Paréntesis', 'sin abrir'),
+        'CH[': ('Corchete', 'sin cerrar'),
+        'CH]': ('Corchete', 'sin abrir'),
+    }
+
+    def finish(self):
+        for index in self.lexer.bracket_index.unmatched:
+            token = self.tokens[index]
+            symbol, problem = self.symbols[token.type]
+            self.errors.append({
+                'line': token.line,
+                'type': 'SYMBOL_IMBALANCE',
+                'message': f"{symbol} '{token.value}' {problem}"
+            })
 
 # Add a function to convert infix to postfix notation
 def infix_to_postfix(expression):
@@ -726,337 +1259,463 @@ def infix_to_postfix(expression):
 
 # Add a function to convert infix to prefix notation
 def infix_to_prefix(expression):
-    # Primero separamos la parte izquierda y derecha de la asignación
-    parts = expression.split('=')
-    if len(parts) < 2:
-        return expression
+    return assignment_to_prefix(parse_assignment(expression))
 
-    left_side = parts[0].strip()
-    right_side = parts[1].strip()
-    
-    # Eliminar comentarios si existen
-    if '//' in right_side:
-        right_side = right_side.split('//')[0].strip()
-    
-    # Verificar si hay operadores compuestos (+=, -=, etc.)
-    if left_side.endswith('+') or left_side.endswith('-') or left_side.endswith('*') or left_side.endswith('/'):
-        return f"{left_side}= ERROR: operador compuesto no soportado"
-    
-    # Buscar todos los operadores y operandos en el lado derecho
-    import re
-    tokens = re.findall(r'[a-zA-Z0-9_]+|[+\-*/()]', right_side)
-    
-    # Verificar si hay tokens adyacentes sin operador entre ellos
-    for i in range(len(tokens) - 1):
-        if re.match(r'[a-zA-Z0-9_]+', tokens[i]) and re.match(r'[a-zA-Z0-9_]+', tokens[i+1]):
-            return f"{left_side} = ERROR: falta operador entre {tokens[i]} y {tokens[i+1]}"
-    
-    # Función auxiliar para convertir a notación prefija
-    def convert_to_prefix(tokens):
-        if not tokens or len(tokens) == 0:
-            return ''
-        
-        # Si solo hay un token, devolverlo
-        if len(tokens) == 1:
-            return tokens[0]
-        
-        # Buscar el operador de menor precedencia
-        min_precedence_idx = -1
-        min_precedence = float('inf')
-        parentheses_level = 0
-        
-        precedence = {'+': 1, '-': 1, '*': 2, '/': 2}
-        
-        for i in range(len(tokens) - 1, -1, -1):
-            token = tokens[i]
-            
-            if token == ')':
-                parentheses_level += 1
-            elif token == '(':
-                parentheses_level -= 1
-            
-            # Solo considerar operadores fuera de paréntesis y con la precedencia más baja
-            if parentheses_level == 0 and token in precedence:
-                if precedence[token] <= min_precedence:
-                    min_precedence = precedence[token]
-                    min_precedence_idx = i
-        
-        # Si no se encontró operador, buscar paréntesis
-        if min_precedence_idx == -1:
-            if tokens[0] == '(' and tokens[-1] == ')':
-                # Quitar paréntesis externos y procesar el contenido
-                return convert_to_prefix(tokens[1:-1])
-            # Si no hay operadores ni paréntesis, devolver los tokens como están
-            return ' '.join(tokens)
-        
-        # Dividir en operando izquierdo y derecho
-        operator = tokens[min_precedence_idx]
-        left_tokens = tokens[:min_precedence_idx]
-        right_tokens = tokens[min_precedence_idx + 1:]
-        
-        # Convertir recursivamente los operandos
-        left_prefix = convert_to_prefix(left_tokens)
-        right_prefix = convert_to_prefix(right_tokens)
-        
-        # Construir la expresión prefija
-        return f"{operator} {left_prefix} {right_prefix}"
-    
-    # Convertir el lado derecho a notación prefija
-    prefix_right_side = convert_to_prefix(tokens)
-    
-    # Construir la expresión completa
-    return f"{left_side} = {prefix_right_side}"
-
-# Reemplazar la función generate_triplets con esta versión en Python
 def generate_triplets(expression):
-    triplets = []
-    
-    # Primero separamos la parte izquierda y derecha de la asignación
-    parts = expression.split('=')
-    if len(parts) < 2:
-        return triplets
-    
-    left_side = parts[0].strip()
-    right_side = parts[1].strip()
-    
-    # Eliminar comentarios si existen
-    if '//' in right_side:
-        right_side = right_side.split('//')[0].strip()
-    
-    # Verificar si hay operadores compuestos (+=, -=, etc.)
-    if left_side.endswith('+') or left_side.endswith('-') or left_side.endswith('*') or left_side.endswith('/'):
-        return triplets  # No generar tripletas para operadores no soportados
-    
-    # Buscar todos los operadores y operandos en el lado derecho
-    import re
-    tokens = re.findall(r'[a-zA-Z0-9_]+|[+\-*/()]', right_side)
-    
-    # Verificar si hay tokens adyacentes sin operador entre ellos
-    for i in range(len(tokens) - 1):
-        if re.match(r'[a-zA-Z0-9_]+', tokens[i]) and re.match(r'[a-zA-Z0-9_]+', tokens[i+1]):
-            return triplets  # No generar tripletas si hay error de sintaxis
-    
-    # Función para generar tripletas recursivamente
-    def generate_triplets_recursive(tokens, temp_var_counter=1):
-        if not tokens or len(tokens) == 0:
-            return {'result': '', 'counter': temp_var_counter}
-        
-        # Si solo hay un token, devolverlo
-        if len(tokens) == 1:
-            return {'result': tokens[0], 'counter': temp_var_counter}
-        
-        # Buscar el operador de menor precedencia
-        min_precedence_idx = -1
-        min_precedence = float('inf')
-        parentheses_level = 0
-        
-        precedence = {'+': 1, '-': 1, '*': 2, '/': 2}
-        
-        for i in range(len(tokens) - 1, -1, -1):
-            token = tokens[i]
-            
-            if token == ')':
-                parentheses_level += 1
-            elif token == '(':
-                parentheses_level -= 1
-            
-            # Solo considerar operadores fuera de paréntesis y con la precedencia más baja
-            if parentheses_level == 0 and token in precedence:
-                if precedence[token] <= min_precedence:
-                    min_precedence = precedence[token]
-                    min_precedence_idx = i
-        
-        # Si no se encontró operador, buscar paréntesis
-        if min_precedence_idx == -1:
-            if tokens[0] == '(' and tokens[-1] == ')':
-                # Quitar paréntesis externos y procesar el contenido
-                return generate_triplets_recursive(tokens[1:-1], temp_var_counter)
-            # Si no hay operadores ni paréntesis, devolver los tokens como están
-            return {'result': ' '.join(tokens), 'counter': temp_var_counter}
-        
-        # Dividir en operando izquierdo y derecho
-        operator = tokens[min_precedence_idx]
-        left_tokens = tokens[:min_precedence_idx]
-        right_tokens = tokens[min_precedence_idx + 1:]
-        
-        # Procesar recursivamente los operandos
-        left_result = generate_triplets_recursive(left_tokens, temp_var_counter)
-        right_result = generate_triplets_recursive(right_tokens, left_result['counter'])
-        
-        # Crear una nueva variable temporal
-        temp_var = f"T{right_result['counter']}"
-        new_counter = right_result['counter'] + 1
-        
-        # Descripción del operador
-        op_desc = {
-            '+': 'suma',
-            '-': 'resta',
-            '*': 'multiplica',
-            '/': 'divide'
-        }
-        
-        # Generar tripletas
-        if left_result['result'].startswith('T'):
-            # No necesitamos una tripleta adicional si el resultado izquierdo ya es una variable temporal
-            pass
-        else:
-            triplets.append({
-                'object': temp_var,
-                'source': left_result['result'],
-                'operator': '=',
-                'description': f"Asigna el valor de {left_result['result']} a una variable temporal"
-            })
-        
-        triplets.append({
-            'object': temp_var,
-            'source': right_result['result'],
-            'operator': operator,
-            'description': f"Se {op_desc.get(operator, 'opera')} el valor de {right_result['result']} a la variable temporal"
-        })
-        
-        return {'result': temp_var, 'counter': new_counter}
-    
-    # Caso simple: asignación directa
-    if len(tokens) == 1:
-        triplets.append({
-            'object': left_side,
-            'source': tokens[0],
-            'operator': '=',
-            'description': f"Asigna el valor de {tokens[0]} a {left_side}"
-        })
-        return triplets
-    
-    # Caso complejo: expresión con operadores
-    result = generate_triplets_recursive(tokens)
-    
-    # Agregar la asignación final
-    triplets.append({
-        'object': left_side,
-        'source': result['result'],
-        'operator': '=',
-        'description': f"Se asigna el resultado final a {left_side}"
-    })
-    
-    return triplets
+    return assignment_to_triplets(parse_assignment(expression))
+
+def analyze_line_expression(syntax, errors_only=False):
+    # Asignación de una línea ya analizada (LineSyntax): {'error': ...} o la expresión
+    # con su prefija y tripletas, que son recorridos del árbol de la asignación.
+    # Con errors_only no se generan la prefija ni las tripletas (devuelve None si no hay error).
+    parsed = syntax.assignment
+    if parsed is None:
+        return None
+    if parsed.error is not None:
+        return {'error': parsed.error}
+    if errors_only:
+        return None
+
+    return {
+        'expression': parsed.expression,
+        'prefix': assignment_to_prefix(parsed),
+        'triplets': assignment_to_triplets(parsed)
+    }
+
+# Secciones de la respuesta de /tokenize; `fields` elige cuáles calcular
+RESPONSE_FIELDS = ("identificadores", "tokens", "errores", "syntaxResults", "expressions", "triplets", "scopes")
+ERROR_FIELDS = ("errores", "syntaxResults")
+
+def parse_fields(value):
+    # Acepta una lista o una cadena separada por comas; None equivale a todas las secciones
+    if value is None or value == "":
+        return RESPONSE_FIELDS
+    if isinstance(value, str):
+        names = value.split(",")
+    elif isinstance(value, list) and all(isinstance(name, str) for name in value):
+        names = value
+    else:
+        raise ValueError("'fields' debe ser una cadena o una lista de cadenas")
+    fields = tuple(name.strip() for name in names if name.strip())
+    unknown = [name for name in fields if name not in RESPONSE_FIELDS]
+    if unknown:
+        raise ValueError(f"Secciones desconocidas: {', '.join(unknown)}")
+    return tuple(name for name in RESPONSE_FIELDS if name in fields)
+
+# Respuestas de /tokenize ya serializadas, por hash del código
+TOKENIZE_CACHE_MAX_ENTRIES = 256
+TOKENIZE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TOKENIZE_CACHE_TTL = 600  # segundos
+tokenize_cache = ResultCache(TOKENIZE_CACHE_MAX_ENTRIES, TOKENIZE_CACHE_MAX_BYTES, TOKENIZE_CACHE_TTL)
+
+# Resultados por línea (tokens sin IDs, veredicto sintáctico, prefija y tripletas).
+# El presupuesto cuenta los bytes de las entradas; la memoria que retiene el proceso
+# puede ser varias veces mayor, porque cada entrada que sobrevive a una petición grande
+# mantiene ocupadas páginas del asignador de Python. Por eso el límite de entradas es bajo.
+LINE_CACHE_MAX_ENTRIES = 20000
+LINE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+line_cache = LineCache(LINE_CACHE_MAX_ENTRIES, LINE_CACHE_MAX_BYTES)
+
+# Textos con al menos estas líneas se analizan por fragmentos en varios procesos.
+# Con una sola CPU no hay paralelismo: repartir fragmentos solo suma el costo de enviarlos.
+SHARDED_ANALYSIS_MIN_LINES = int(os.environ.get("NOVA_SHARDED_MIN_LINES", "50000"))
+SHARDED_ANALYSIS_SHARDS = 4 * (os.cpu_count() or 1)  # Varios por proceso para repartir mejor la carga
+SHARDED_ANALYSIS_ENABLED = (os.cpu_count() or 1) > 1
+
+# Instrumentación: cabecera Server-Timing (también con ?timing=1), histogramas en
+# /metrics y perfiles de cProfile de peticiones lentas muestreadas (NOVA_PROFILE_DIR)
+SERVER_TIMING_ENABLED = os.environ.get("NOVA_SERVER_TIMING") == "1"
+metrics = MetricsRegistry()
+profile_sampler = ProfileSampler(
+    directory=os.environ.get("NOVA_PROFILE_DIR"),
+    every=int(os.environ.get("NOVA_PROFILE_EVERY", "10")),
+    slow_seconds=float(os.environ.get("NOVA_PROFILE_SLOW_SECONDS", "1.0")),
+)
+# Una de cada NOVA_RULE_PROFILE_EVERY peticiones mide cada regla semántica (0 lo desactiva)
+RULE_PROFILE_EVERY = int(os.environ.get("NOVA_RULE_PROFILE_EVERY", "20"))
+rule_profile_counter = count()
+
+def sample_rule_profile():
+    return RULE_PROFILE_EVERY > 0 and next(rule_profile_counter) % RULE_PROFILE_EVERY == 0
 
 # Modificar la función tokenize para detectar errores de sintaxis en expresiones
 @app.route("/tokenize", methods=["POST"])
 def tokenize():
     data = request.get_json()
     text = data["code"]
-    lex = Lexer(text)
+    try:
+        fields = parse_fields(request.args.get("fields", data.get("fields")))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    if request.args.get("stream") == "ndjson":
+        return stream_analysis(text, fields)
+    # Formato binario columnar si el cliente lo prefiere sobre JSON (Accept)
+    binary = request.accept_mimetypes.best_match(["application/json", binary_tokens.MEDIA_TYPE]) == binary_tokens.MEDIA_TYPE
+    mimetype = binary_tokens.MEDIA_TYPE if binary else "application/json"
+    key = content_key(text)
+    if fields != RESPONSE_FIELDS:
+        key += ":" + ",".join(fields)
+    if binary:
+        key += ":binary"
+    body = tokenize_cache.get(key)
+    if body is not None:
+        metrics.increment("cache_hits")
+        response = encoded_response(body, key, mimetype)
+        response.vary.add("Accept")
+        return response
+
+    # Análisis instrumentado: tiempos por etapa (y por regla en las peticiones muestreadas),
+    # métricas y perfil muestreado
+    timer = StageTimer(profile_rules=sample_rule_profile())
+    start = time.perf_counter()
+    profiler = profile_sampler.start()
+    line_count = text.count("\n") + 1
+    try:
+        # Los textos muy grandes se analizan por fragmentos en el pool de lotes
+        sharded = SHARDED_ANALYSIS_ENABLED and line_count >= SHARDED_ANALYSIS_MIN_LINES
+        pool = get_batch_pool() if sharded else None
+        try:
+            lex, sections = run_analysis(text, timer, fields, pool)
+        except BrokenProcessPool:
+            reset_batch_pool(pool)
+            lex, sections = run_analysis(text, timer, fields)
+        with timer.stage("json"):
+            # Los tokens se escriben directamente desde los objetos Token del lexer
+            if binary:
+                body = binary_tokens.encode_binary_response(sections, lex if "tokens" in fields else None)
+            else:
+                body = encode_response(sections, lex.get_tokens() if "tokens" in fields else None)
+    finally:
+        elapsed = time.perf_counter() - start
+        profile_sampler.finish(profiler, elapsed)
+    timer.counts = {"requests": 1, "lines": line_count, "tokens": len(lex.tokens), "errors": len(sections.get("errores", ()))}
+    metrics.observe(timer, elapsed)
+    tokenize_cache.put(key, body)
+
+    response = encoded_response(body, key, mimetype)
+    response.vary.add("Accept")
+    if SERVER_TIMING_ENABLED or request.args.get("timing"):
+        response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+def encoded_response(body, key=None, mimetype="application/json"):
+    # Comprime con gzip o deflate si el cliente lo acepta. La versión comprimida de una
+    # respuesta cacheada se guarda como variante de su entrada para no recomprimirla en cada acierto.
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is not None and len(body) >= MIN_COMPRESS_BYTES:
+        compressed = tokenize_cache.get_variant(key, encoding) if key is not None else None
+        if compressed is None:
+            compressed = compress(body, encoding)
+            if key is not None:
+                tokenize_cache.put_variant(key, encoding, compressed)
+        response = app.response_class(compressed, mimetype=mimetype)
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = app.response_class(body, mimetype=mimetype)
+    response.vary.add("Accept-Encoding")
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/tokenize/cache", methods=["GET"])
+def tokenize_cache_stats():
+    return jsonify({**tokenize_cache.stats(), "lines": line_cache.stats()})
+
+# Variante asíncrona de /tokenize: el análisis corre en un pool de procesos acotado
+ASYNC_ANALYSIS_WORKERS = os.cpu_count() or 1
+ASYNC_ANALYSIS_MAX_PENDING = 4 * ASYNC_ANALYSIS_WORKERS
+ASYNC_ANALYSIS_TIMEOUT = 30  # segundos
+analysis_pool = AnalysisPool(ASYNC_ANALYSIS_WORKERS, ASYNC_ANALYSIS_MAX_PENDING)
+
+@app.route("/tokenize/async", methods=["POST"])
+def tokenize_async():
+    # El análisis corre en otro proceso; este hilo solo espera el resultado
+    data = request.get_json()
+    text = data["code"]
+    key = content_key(text)
+    body = tokenize_cache.get(key)
+    if body is None:
+        try:
+            result = analysis_pool.run(analyze_code, text, timeout=ASYNC_ANALYSIS_TIMEOUT)
+        except PoolFull as error:
+            response = jsonify({"error": f"Servidor ocupado: {error}"})
+            response.headers["Retry-After"] = "1"
+            return response, 429
+        except FutureTimeoutError:
+            return jsonify({"error": f"El análisis excedió {ASYNC_ANALYSIS_TIMEOUT} segundos"}), 504
+        except BrokenProcessPool as error:
+            # El pool ya se reemplazó: el cliente puede reintentar
+            response = jsonify({"error": f"El proceso de análisis terminó de forma abrupta: {error}"})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+        body = encode_json(result)
+        tokenize_cache.put(key, body)
+    return encoded_response(body, key)
+
+@app.route("/tokenize/async/stats", methods=["GET"])
+def tokenize_async_stats():
+    return jsonify(analysis_pool.stats())
+
+@app.route("/health", methods=["GET"])
+def health():
+    # Listo cuando el worker puede analizar un programa mínimo
+    lex = Lexer("int _a = 1;")
     lex.tokenize()
-    tokens = lex.get_tokens()
-    identifiers = lex.get_identifiers_info()
-    errors = lex.detect_errors()
-    syntax_results = lex.check_syntax()
+    return jsonify({"status": "ok", "pid": os.getpid(), "backends": list(LEXER_BACKENDS)})
+
+def stream_analysis(text, fields=RESPONSE_FIELDS):
+    # Respuesta NDJSON: un registro por línea con tokens y después un registro por
+    # sección. Los tokens se serializan línea a línea en lugar de en un solo JSON.
+    lex = Lexer(text, line_cache=line_cache)
+
+    def records():
+        for line_number, tokens_line in lex.iter_tokens():
+            if tokens_line and "tokens" in fields:
+                yield b'{"line":%d,"tokens":%s,"type":"tokens"}\n' % (line_number, encode_tokens(tokens_line))
+        for name, data in analysis_sections(lex, fields=fields).items():
+            yield encode_json({"type": name, "data": data}) + b"\n"
+
+    return app.response_class(records(), mimetype="application/x-ndjson")
+
+@contextmanager
+def timed_stage(timer, name):
+    # Mide el bloque como la etapa `name` del StageTimer (no hace nada si timer es None)
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+def analysis_sections(lex, timer=None, fields=RESPONSE_FIELDS):
+    # Secciones pedidas excepto los tokens (el lexer ya analizó el texto). Cada etapa
+    # se ejecuta solo si alguna sección pedida depende de ella:
+    #   errores -> detect_errors, check_syntax y errores de expresiones
+    #   syntaxResults -> check_syntax
+    #   expressions, triplets -> prefija y tripletas (incluye los errores de expresiones)
+    sections = {}
+    need_errors = "errores" in fields
+    need_syntax = need_errors or "syntaxResults" in fields
+    need_expressions = "expressions" in fields or "triplets" in fields
+    
+    if "identificadores" in fields:
+        with timed_stage(timer, "get_identifiers_info"):
+            sections["identificadores"] = lex.get_identifiers_info()
+    errors = []
+    if need_errors:
+        profile_rules = timer is not None and timer.profile_rules
+        with timed_stage(timer, "detect_errors"):
+            errors = lex.detect_errors(profile=profile_rules)
+        if profile_rules:
+            timer.rules = dict(lex.rule_timings)
+    if need_syntax:
+        with timed_stage(timer, "check_syntax"):
+            syntax_results = lex.check_syntax()
     
     # Analyze expressions
     expressions = []
     triplets = []
     
-    # Group tokens by line
-    lines = {}
-    for token in tokens:
-        line = token['line']
-        if line not in lines:
-            lines[line] = []
-        lines[line].append(token)
-    
-    # Find expressions in the code
-    for line_num, line_tokens in lines.items():
-        # Filtrar tokens de comentarios
-        code_tokens = [t for t in line_tokens if t['type'] != 'COMM']
-        
-        # Verificar si hay una asignación
-        has_assignment = any(t['type'] == 'ASSGN' for t in code_tokens)
-        
-        if has_assignment:
-            # Extraer la expresión completa
-            expression_parts = []
-            for token in code_tokens:
-                if token['type'] == 'IDEN' or token['type'].startswith('AOP') or token['type'] == 'ASSGN' or \
-                   token['type'] == 'NUMINT' or token['type'] == 'NUMDB' or \
-                   token['type'] == 'CH(' or token['type'] == 'CH)':
-                    expression_parts.append(token['value'])
-            
-            expression = ''.join(expression_parts)
+    # Find expressions in the code (resultados por línea, compartidos con la caché de líneas)
+    if need_expressions:
+        with timed_stage(timer, "prefix_triplets"):
+            for line_num in range(1, len(lex.line_tokens) + 1):
+                result = lex.line_expression(line_num)
+                if result is None:
+                    continue
             
-            # Verificar si hay operadores adyacentes o identificadores sin operador entre ellos
-            has_syntax_error = False
-            for i in range(len(code_tokens) - 1):
-                if code_tokens[i]['type'] == 'IDEN' and code_tokens[i+1]['type'] == 'IDEN':
+                if 'error' in result:
                     errors.append({
                         'line': line_num,
                         'type': 'SYNTAX_ERROR',
-                        'message': f"Falta operador entre {code_tokens[i]['value']} y {code_tokens[i+1]['value']}"
-                    })
-                    has_syntax_error = True
-                    break
-            
-            if not has_syntax_error:
-                # Convertir a notación prefija
-                prefix = infix_to_prefix(expression)
-                
-                # Verificar si hay un error en la conversión
-                if 'ERROR:' in prefix:
-                    error_msg = prefix.split('ERROR:')[1].strip()
-                    errors.append({
-                        'line': line_num,
-                        'type': 'SYNTAX_ERROR',
-                        'message': error_msg
+                        'message': result['error']
                     })
                 else:
                     expressions.append({
                         'line': line_num,
-                        'expression': expression,
-                        'prefix': prefix
+                        'expression': result['expression'],
+                        'prefix': result['prefix']
                     })
-                    
-                    # Generar tripletas
-                    expr_triplets = generate_triplets(expression)
-                    triplets.extend(expr_triplets)
+                    triplets.extend(result['triplets'])
+        sections["expressions"] = expressions
+        sections["triplets"] = triplets
+    elif need_errors:
+        # Solo los errores: sin árbol de expresión, prefija ni tripletas
+        with timed_stage(timer, "expression_errors"):
+            for line_num in range(1, len(lex.line_tokens) + 1):
+                error = lex.line_expression_error(line_num)
+                if error is not None:
+                    errors.append({'line': line_num, 'type': 'SYNTAX_ERROR', 'message': error})
+    
+    if need_errors:
+        with timed_stage(timer, "merge_errors"):
+            # Combine errors léxicos y sintácticos, evitando duplicados
+            syntax_errors = [
+                {'line': res['line'], 'type': 'SYNTAX_ERROR', 'message': res['message']} 
+                for res in syntax_results if not res['valid']
+            ]
+            
+            # Eliminar errores duplicados y errores sintácticos para líneas con errores semánticos
+            unique_errors = ErrorCollection(errors)
+            for error in syntax_errors:
+                unique_errors.add_if_line_clear(error)
+        sections["errores"] = unique_errors.to_list()
     
-    # Combine errors léxicos y sintácticos, evitando duplicados
-    syntax_errors = [
-        {'line': res['line'], 'type': 'SYNTAX_ERROR', 'message': res['message']} 
-        for res in syntax_results if not res['valid']
-    ]
+    if "syntaxResults" in fields:
+        sections["syntaxResults"] = syntax_results
     
-    # Eliminar errores duplicados y errores sintácticos para líneas con errores semánticos
-    unique_errors = []
-    error_lines = set()
-
-    # Primero, agregar errores semánticos
-    for error in errors:
-        if not any(
-            e['type'] == error['type'] and 
-            e['line'] == error['line'] and 
-            e.get('variable') == error.get('variable') and
-            e.get('message') == error.get('message')
-            for e in unique_errors
-        ):
-            unique_errors.append(error)
-            error_lines.add(error['line'])
-
-    # Luego, agregar errores sintácticos solo para líneas sin errores semánticos
-    for error in syntax_errors:
-        if error['line'] not in error_lines and not any(
-            e['type'] == error['type'] and 
-            e['line'] == error['line'] and 
-            e['message'] == error['message']
-            for e in unique_errors
-        ):
-            unique_errors.append(error)
+    if "scopes" in fields:
+        with timed_stage(timer, "scopes"):
+            sections["scopes"] = lex.get_scopes()
     
-    return jsonify({
-        "identificadores": identifiers,
-        "tokens": tokens,
-        "errores": unique_errors,
-        "syntaxResults": [{'line': res['line'], 'valid': res['valid'], 'message': res['message']} for res in syntax_results],
-        "expressions": expressions,
-        "triplets": triplets
-    })
+    return {name: sections[name] for name in fields if name in sections}
+
+def run_analysis(text, timer=None, fields=RESPONSE_FIELDS, pool=None):
+    # Lexer ya ejecutado y secciones pedidas (sin los tokens). Con `pool`, el análisis
+    # por línea se reparte en fragmentos entre sus procesos
+    with timed_stage(timer, "tokenize"):
+        lex = Lexer(text, line_cache=line_cache)
+        if pool is None:
+            lex.tokenize()
+        else:
+            expressions = "errores" in fields or "expressions" in fields or "triplets" in fields
+            lex.tokenize_sharded(pool, SHARDED_ANALYSIS_SHARDS, expressions)
+    return lex, analysis_sections(lex, timer, fields)
+
+def analyze_code(text, timer=None, fields=RESPONSE_FIELDS, pool=None):
+    # Análisis de un programa: el contenido de la respuesta de /tokenize como diccionario
+    lex, result = run_analysis(text, timer, fields, pool)
+    if "tokens" in fields:
+        with timed_stage(timer, "tokens"):
+            result["tokens"] = [token.to_dict() for token in lex.get_tokens()]
+    return result
+
+# Análisis por lotes en un pool de procesos (uno por CPU), creado al primer uso
+batch_pool = None
+batch_pool_lock = threading.Lock()
+
+def get_batch_pool():
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is None:
+            batch_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return batch_pool
+
+def reset_batch_pool(broken_pool):
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is broken_pool:
+            batch_pool = None
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
+def submit_batch_document(code, fields):
+    # Devuelve (pool, futuro); si el pool quedó inutilizable se reemplaza una vez
+    pool = get_batch_pool()
+    try:
+        return pool, pool.submit(analyze_document, code, fields)
+    except BrokenProcessPool:
+        reset_batch_pool(pool)
+        pool = get_batch_pool()
+        return pool, pool.submit(analyze_document, code, fields)
+
+def analyze_document(code, fields=RESPONSE_FIELDS):
+    # Se ejecuta en los procesos del pool; los errores se devuelven en lugar de propagarse
+    try:
+        return analyze_code(code, fields=fields)
+    except Exception as error:
+        return {"error": f"{type(error).__name__}: {error}"}
+
+@app.route("/tokenize/batch", methods=["POST"])
+def tokenize_batch():
+    data = request.get_json()
+    documents = data.get("documents") if isinstance(data, dict) else None
+    if not isinstance(documents, list):
+        return jsonify({"error": "Se esperaba una lista de documentos en 'documents'"}), 400
+    try:
+        fields = ERROR_FIELDS if data.get("errorsOnly") else parse_fields(data.get("fields"))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    # Los resultados se indexan por ID (o por posición si el documento no trae ID)
+    document_ids = [str(document.get("id", index)) if isinstance(document, dict) else str(index)
+                    for index, document in enumerate(documents)]
+    duplicates = sorted(document_id for document_id, count in Counter(document_ids).items() if count > 1)
+    if duplicates:
+        return jsonify({"error": f"IDs de documento repetidos: {', '.join(duplicates)}"}), 400
+
+    # Enviar todos los documentos al pool antes de esperar resultados
+    pending = []
+    results = {}
+    for document_id, document in zip(document_ids, documents):
+        code = document.get("code") if isinstance(document, dict) else None
+        if not isinstance(code, str):
+            results[document_id] = {"error": "Documento sin código"}
+            continue
+        pending.append((document_id, submit_batch_document(code, fields)))
+
+    for document_id, (pool, future) in pending:
+        try:
+            results[document_id] = future.result()
+        except BrokenProcessPool as error:
+            # Un proceso del pool terminó de forma abrupta: el siguiente lote usa un pool nuevo
+            reset_batch_pool(pool)
+            results[document_id] = {"error": f"{type(error).__name__}: {error}"}
+        except Exception as error:
+            results[document_id] = {"error": f"{type(error).__name__}: {error}"}
+
+    failed = sum(1 for result in results.values() if "error" in result)
+    return jsonify({"results": results, "failed": failed})
+
+# Documentos abiertos para el análisis incremental (los menos usados se descartan)
+MAX_INCREMENTAL_DOCUMENTS = 100
+incremental_documents = OrderedDict()  # documentId -> (Lexer, lock del documento)
+incremental_lock = threading.Lock()  # Solo protege el diccionario
+
+@app.route("/tokenize/incremental", methods=["POST"])
+def tokenize_incremental():
+    data = request.get_json()
+    document_id = data.get("documentId")
+
+    # Abrir (o reabrir) el documento con el código completo; se analiza fuera del lock
+    if "code" in data:
+        document_id = document_id or uuid.uuid4().hex
+        lex = Lexer(data["code"])
+        lex.tokenize()
+        line_count = len(lex.line_tokens)
+        lines = lex.get_line_results(1, line_count)
+        with incremental_lock:
+            incremental_documents[document_id] = (lex, threading.Lock())
+            incremental_documents.move_to_end(document_id)
+            while len(incremental_documents) > MAX_INCREMENTAL_DOCUMENTS:
+                incremental_documents.popitem(last=False)
+        return jsonify({
+            "documentId": document_id,
+            "startLine": 1,
+            "removedLines": 0,
+            "lineShift": line_count,
+            "lineCount": line_count,
+            "lines": lines
+        })
+
+    with incremental_lock:
+        document = incremental_documents.get(document_id)
+        if document is not None:
+            incremental_documents.move_to_end(document_id)
+    if document is None:
+        # El cliente debe volver a enviar el código completo
+        return jsonify({"error": "Documento desconocido, envíe el código completo"}), 404
+
+    # Las ediciones de un mismo documento se aplican de una en una
+    lex, document_lock = document
+    with document_lock:
+        try:
+            delta = lex.apply_edit(int(data["startLine"]), int(data["endLine"]), data["text"])
+        except (KeyError, TypeError, ValueError) as error:
+            return jsonify({"error": f"Edición inválida: {error}"}), 400
+
+    delta["documentId"] = document_id
+    return jsonify(delta)
 
 if __name__ == "__main__":
     app.run(debug=True)
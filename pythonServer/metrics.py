@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+import cProfile
+import os
+import threading
+import time
+
+# Instrumentación del análisis: tiempos por etapa (reloj y CPU), histogramas de
+# latencia para /metrics y muestreo de perfiles de cProfile de peticiones lentas.
+
+# Límites superiores (segundos) de los buckets de los histogramas
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class StageTimer:
+    def __init__(self, profile_rules=False):
+        self.wall = {}  # Etapa -> segundos de reloj
+        self.cpu = {}  # Etapa -> segundos de CPU del proceso
+        self.counts = {}  # Tokens, errores, ...
+        # Con profile_rules, detect_errors mide cada regla semántica (más lento)
+        self.profile_rules = profile_rules
+        self.rules = {}  # Regla -> segundos de reloj
+
+    @contextmanager
+    def stage(self, name):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.wall[name] = self.wall.get(name, 0.0) + time.perf_counter() - wall_start
+            self.cpu[name] = self.cpu.get(name, 0.0) + time.process_time() - cpu_start
+
+    def server_timing(self):
+        # Valor de la cabecera Server-Timing (duraciones en milisegundos)
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.wall.items())
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # El último bucket es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_latency = {}  # Etapa -> Histogram
+        self.stage_cpu = {}  # Etapa -> segundos de CPU acumulados
+        self.totals = {}  # Contadores (peticiones, tokens, errores, ...)
+        self.rule_seconds = {}  # Regla semántica -> segundos acumulados en peticiones perfiladas
+        self.rule_profiles = 0  # Peticiones con tiempos por regla
+
+    def observe(self, timer, total_seconds):
+        with self._lock:
+            for name, seconds in timer.wall.items():
+                self.stage_latency.setdefault(name, Histogram()).observe(seconds)
+                self.stage_cpu[name] = self.stage_cpu.get(name, 0.0) + timer.cpu.get(name, 0.0)
+            self.stage_latency.setdefault("total", Histogram()).observe(total_seconds)
+            for name, value in timer.counts.items():
+                self.totals[name] = self.totals.get(name, 0) + value
+            if timer.rules:
+                self.rule_profiles += 1
+                for name, seconds in timer.rules.items():
+                    self.rule_seconds[name] = self.rule_seconds.get(name, 0.0) + seconds
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.totals[name] = self.totals.get(name, 0) + value
+
+    def render(self):
+        # Formato de exposición de texto de Prometheus
+        lines = [
+            "# HELP nova_stage_seconds Latencia de cada etapa del análisis",
+            "# TYPE nova_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in self.stage_latency.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'nova_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'nova_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'nova_stage_seconds_sum{{stage="{name}"}} {histogram.sum}')
+                lines.append(f'nova_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+            lines.append("# HELP nova_stage_cpu_seconds_total Tiempo de CPU acumulado por etapa")
+            lines.append("# TYPE nova_stage_cpu_seconds_total counter")
+            for name, seconds in self.stage_cpu.items():
+                lines.append(f'nova_stage_cpu_seconds_total{{stage="{name}"}} {seconds}')
+            lines.append("# HELP nova_rule_seconds_total Tiempo acumulado por regla semántica en las peticiones perfiladas")
+            lines.append("# TYPE nova_rule_seconds_total counter")
+            for name, seconds in self.rule_seconds.items():
+                lines.append(f'nova_rule_seconds_total{{rule="{name}"}} {seconds}')
+            lines.append("# TYPE nova_rule_profiled_requests_total counter")
+            lines.append(f"nova_rule_profiled_requests_total {self.rule_profiles}")
+            for name, value in self.totals.items():
+                lines.append(f"# TYPE nova_{name}_total counter")
+                lines.append(f"nova_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+class ProfileSampler:
+    # Perfila una de cada `every` peticiones y guarda el perfil si tardó más de `slow_seconds`
+    def __init__(self, directory=None, every=10, slow_seconds=1.0):
+        self.directory = directory
+        self.every = every
+        self.slow_seconds = slow_seconds
+        self._lock = threading.Lock()
+        self._active = False  # cProfile no admite dos perfiladores a la vez
+        self.requests = 0
+        self.dumped = 0
+
+    def start(self):
+        # Devuelve un perfilador activo o None si esta petición no se muestrea
+        if self.directory is None:
+            return None
+        with self._lock:
+            self.requests += 1
+            if self._active or self.requests % self.every:
+                return None
+            self._active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def finish(self, profiler, elapsed, label="tokenize"):
+        if profiler is None:
+            return None
+        profiler.disable()
+        path = None
+        try:
+            if elapsed >= self.slow_seconds:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.requests}.prof")
+                profiler.dump_stats(path)
+                self.dumped += 1
+        finally:
+            with self._lock:
+                self._active = False
+        return path
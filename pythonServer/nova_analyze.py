@@ -0,0 +1,114 @@
+import argparse
+import json
+import mmap
+from multiprocessing import Pool
+import os
+import sys
+import time
+
+from main import analyze_code, ERROR_FIELDS, RESPONSE_FIELDS
+
+# Analizador por lotes sin servidor: recorre carpetas de archivos .nova, los
+# analiza en un pool de procesos y escribe un resultado JSON por línea.
+
+NOVA_EXTENSION = ".nova"
+
+
+def find_nova_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, directories, files in os.walk(path):
+                directories.sort()
+                for name in sorted(files):
+                    if name.endswith(NOVA_EXTENSION):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def read_source(path):
+    # Lectura con mmap: el archivo se decodifica directamente desde el mapa de memoria
+    with open(path, "rb") as source:
+        if os.fstat(source.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return str(mapped, "utf-8")
+
+
+def analyze_file(job, pool=None):
+    # Con `pool`, el archivo se analiza por fragmentos entre sus procesos
+    path, fields = job
+    start = time.perf_counter()
+    try:
+        text = read_source(path)
+        result = analyze_code(text, fields=fields, pool=pool)
+    except Exception as error:
+        return {"path": path, "error": f"{type(error).__name__}: {error}"}
+    record = {
+        "path": path,
+        "lines": text.count("\n") + 1,
+        "errorCount": len(result["errores"]),
+        "seconds": time.perf_counter() - start,
+    }
+    record.update(result)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="nova-analyze", description="Analiza archivos .nova y escribe un resultado JSON por línea")
+    parser.add_argument("paths", nargs="+", help="archivos .nova o carpetas que los contienen")
+    parser.add_argument("--errors-only", action="store_true", help="solo errores y syntaxResults (sin expresiones ni tripletas)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="procesos de análisis")
+    parser.add_argument("--output", help="archivo de salida (por defecto, la salida estándar)")
+    parser.add_argument("--shard-mb", type=float, help="los archivos de al menos este tamaño (MB) se analizan al final, "
+                        "uno a uno y repartidos por fragmentos entre todos los procesos (requiere --jobs 2 o más)")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    summary = {"files": 0, "failed": 0, "withErrors": 0, "lines": 0, "errors": 0}
+    start = time.perf_counter()
+    fields = ERROR_FIELDS if args.errors_only else RESPONSE_FIELDS
+    large_files = []
+    # Con un solo proceso los fragmentos se analizarían uno tras otro: más lento que sin fragmentar
+    shard_bytes = args.shard_mb * 1024 * 1024 if args.shard_mb is not None and args.jobs > 1 else None
+
+    def jobs():
+        for path in find_nova_files(args.paths):
+            try:
+                large = shard_bytes is not None and os.path.getsize(path) >= shard_bytes
+            except OSError:
+                large = False  # analyze_file reporta el error
+            if large:
+                large_files.append(path)
+            else:
+                yield path, fields
+
+    def write(record):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        summary["files"] += 1
+        if "error" in record:
+            summary["failed"] += 1
+            return
+        summary["lines"] += record["lines"]
+        summary["errors"] += record["errorCount"]
+        summary["withErrors"] += record["errorCount"] > 0
+
+    try:
+        with Pool(args.jobs) as pool:
+            # Los resultados se escriben en cuanto llegan, sin esperar al resto
+            for record in pool.imap_unordered(analyze_file, jobs(), chunksize=4):
+                write(record)
+            for path in large_files:
+                write(analyze_file((path, fields), pool))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["filesPerSecond"] = summary["files"] / summary["seconds"] if summary["seconds"] else 0.0
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
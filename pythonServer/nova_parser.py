@@ -0,0 +1,962 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import List, Optional
+import re
+
+# Analizador sintáctico de Nova. Cada línea se analiza a partir de sus tokens en
+# una lista de sentencias, encabezados de estructuras y llaves (parse_statements);
+# build_program une después esas listas en bloques que abarcan varias líneas.
+# Las expresiones se analizan por precedencia de operadores con pilas explícitas,
+# sin recursión. El resultado de una línea solo depende de sus tokens y se guarda
+# en la caché de líneas, así que sus nodos no llevan número de línea: solo los
+# llevan los bloques y las estructuras que arma build_program.
+
+
+# Nodos de expresión. Las hojas guardan su texto, que es el operando que muestran
+# la notación prefija y las tripletas
+@dataclass
+class Name:
+    text: str
+
+@dataclass
+class Literal:
+    type: str  # entero, decimal, cadena, booleano
+    text: str
+
+@dataclass
+class Call:
+    function: str
+    arguments: List[object]
+    text: str
+
+@dataclass
+class Index:
+    target: object
+    index: object
+    text: str
+
+@dataclass
+class ListLiteral:
+    elements: List[object]
+    text: str
+
+@dataclass
+class UnaryOp:
+    operator: str
+    operand: object
+
+@dataclass
+class BinaryOp:
+    operator: str
+    left: object = None
+    right: object = None
+
+
+# Sentencias de una línea
+@dataclass
+class VarDecl:
+    var_type: str
+    name: str
+    value: Optional[object]
+
+@dataclass
+class Assignment:
+    target: object  # Name o Index
+    value: object
+
+@dataclass
+class Output:
+    arguments: List[object]
+
+@dataclass
+class Input:
+    arguments: List[object]
+
+@dataclass
+class Return:
+    value: Optional[object]
+
+@dataclass
+class Continue:
+    pass
+
+@dataclass
+class Clear:
+    pass
+
+@dataclass
+class ExpressionStatement:
+    expression: object  # Siempre una llamada
+
+
+# Encabezados de estructura: esperan un bloque, en la misma línea o en la siguiente
+@dataclass
+class IfHeader:
+    condition: object
+    keyword = 'if'
+
+@dataclass
+class ElseHeader:
+    condition: Optional[object] = None  # Condición de "else if" / "elseif"
+    keyword = 'else'
+
+@dataclass
+class WhileHeader:
+    condition: object
+    keyword = 'while'
+
+@dataclass
+class DoHeader:
+    keyword = 'do'
+
+@dataclass
+class ForHeader:
+    init: Optional[object]
+    condition: Optional[object]
+    update: Optional[object]
+    keyword = 'for'
+
+@dataclass
+class Parameter:
+    param_type: Optional[str]
+    name: str
+
+@dataclass
+class FunctionHeader:
+    return_type: Optional[str]
+    name: str
+    parameters: List[Parameter]
+    keyword = 'function'
+
+@dataclass
+class TryHeader:
+    keyword = 'try'
+
+@dataclass
+class CatchHeader:
+    error_name: Optional[str]
+    keyword = 'catch'
+
+@dataclass
+class BlockStart:
+    pass
+
+@dataclass
+class BlockEnd:
+    pass
+
+HEADER_TYPES = (IfHeader, ElseHeader, WhileHeader, DoHeader, ForHeader, FunctionHeader, TryHeader, CatchHeader)
+BLOCK_ITEMS = {'CH{': BlockStart(), 'CH}': BlockEnd()}
+
+
+# Estructuras que arma build_program
+@dataclass
+class Block:
+    statements: List[object]
+    line: int
+    end_line: int
+
+@dataclass
+class Program:
+    statements: List[object] = field(default_factory=list)
+
+@dataclass
+class If:
+    condition: object
+    body: Block
+    orelse: Optional[object]  # Block o If (else if)
+    line: int
+
+@dataclass
+class While:
+    condition: object
+    body: Block
+    line: int
+
+@dataclass
+class DoWhile:
+    body: Block
+    condition: Optional[object]
+    line: int
+
+@dataclass
+class For:
+    init: Optional[object]
+    condition: Optional[object]
+    update: Optional[object]
+    body: Block
+    line: int
+
+@dataclass
+class FunctionDecl:
+    return_type: Optional[str]
+    name: str
+    parameters: List[Parameter]
+    body: Block
+    line: int
+
+@dataclass
+class TryCatch:
+    body: Block
+    error_name: Optional[str]
+    handler: Optional[Block]
+    line: int
+
+
+@dataclass
+class ParsedAssignment:
+    expression: str
+    left_side: Optional[str] = None
+    tree: Optional[object] = None
+    simple: bool = False  # La derecha es un solo token
+    error: Optional[str] = None  # Mensaje del error de sintaxis, si lo hay
+
+@dataclass
+class LineSyntax:
+    items: tuple  # Sentencias, encabezados y llaves de la línea, en orden
+    error: Optional[str] = None  # Primer error de sintaxis de la línea
+    assignment: Optional[ParsedAssignment] = None  # Primera asignación de la línea
+
+
+LITERAL_TYPES = {
+    'NUMINT': 'entero',
+    'NUMDB': 'decimal',
+    'STR': 'cadena',
+    'TRUE': 'booleano',
+    'FALSE': 'booleano',
+}
+
+DECLARATION_TYPES = {'TPINT', 'TPSTR', 'TPDBL'}
+CALLABLE_TYPES = {'IDEN', 'INP', 'OUT'}
+OPERAND_TYPES = {'IDEN', 'NUMINT', 'NUMDB', 'STR', 'TRUE', 'FALSE'}
+SIGNED_TYPES = {'NUMINT', 'NUMDB'}
+
+# Los operadores del mismo nivel se agrupan hacia la derecha, como en los
+# conversores originales de prefija y tripletas (que dividían en el operador de
+# menor precedencia más a la izquierda)
+BINARY_PRECEDENCE = {
+    '||': 1, '|': 1,
+    '&&': 2, '&': 2,
+    '==': 3, '!=': 3,
+    '<': 4, '>': 4, '<=': 4, '>=': 4,
+    '+': 5, '-': 5,
+    '*': 6, '/': 6, '%': 6,
+}
+UNARY_PRECEDENCE = 7
+
+# Operadores de dos tokens: el lexer separa ==, !=, <=, >=, && y ||
+COMPOUND_OPERATORS = {
+    ('ASSGN', 'ASSGN'): '==',
+    ('LOP!', 'ASSGN'): '!=',
+    ('ROP<', 'ASSGN'): '<=',
+    ('ROP>', 'ASSGN'): '>=',
+    ('LOP&', 'LOP&'): '&&',
+    ('LOP|', 'LOP|'): '||',
+}
+
+SINGLE_OPERATORS = {
+    'ROP<': '<', 'ROP>': '>',
+    'LOP&': '&', 'LOP|': '|',
+    'AOP+': '+', 'AOP-': '-', 'AOP*': '*', 'AOP/': '/', 'AOP%': '%',
+}
+
+UNARY_OPERATORS = {'LOP!': '!', 'AOP-': '-', 'AOP+': '+'}
+
+# Operadores de asignación compuesta (+=, -=, *=, /=), que Nova no admite
+COMPOUND_ASSIGNMENT_TYPES = {'AOP+', 'AOP-', 'AOP*', 'AOP/'}
+
+# Entradas de la pila de operadores de una expresión
+BINARY, UNARY, GROUP, CALL, INDEX, LIST = range(6)
+CLOSING_TOKENS = {GROUP: 'CH)', CALL: 'CH)', INDEX: 'CH]', LIST: 'CH]'}
+CLOSING_VALUES = {'CH)': "')'", 'CH]': "']'"}
+
+
+class ParseError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class LineParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        # Tipos de los tokens con dos centinelas al final: se puede mirar uno más allá del fin
+        self.types = [token.type for token in tokens] + [None, None]
+        self.position = 0
+        self.unsigned_next = False  # El siguiente número con signo se leyó como operador
+
+    # Utilidades sobre los tokens de la línea
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def check(self, *token_types):
+        return self.types[self.position] in token_types
+
+    def advance(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def accept(self, token_type):
+        if self.types[self.position] == token_type:
+            return self.advance()
+        return None
+
+    def expect(self, token_type, description):
+        if self.types[self.position] == token_type:
+            return self.advance()
+        raise self.unexpected(description)
+
+    def unexpected(self, description):
+        token = self.peek()
+        found = f"'{token.value}'" if token is not None else "fin de línea"
+        return ParseError(f"Se esperaba {description} y se encontró {found}")
+
+    def text(self, start):
+        # Texto sin espacios de los tokens desde `start` hasta la posición actual
+        return ''.join(token.value for token in self.tokens[start:self.position])
+
+    def check_adjacent_operand(self):
+        # Dos operandos seguidos (p. ej. "_a _b") siempre son un error
+        position = self.position
+        if position > 0 and self.types[position] in OPERAND_TYPES and self.types[position - 1] in OPERAND_TYPES:
+            raise ParseError(f"Falta operador entre {self.tokens[position - 1].value} y {self.tokens[position].value}")
+
+    # Línea completa
+    def parse(self):
+        items = []
+        error = None
+        assignment = None
+        tokens = self.tokens
+        types = self.types
+        while self.position < len(tokens):
+            token_type = types[self.position]
+            if token_type in BLOCK_ITEMS:
+                items.append(BLOCK_ITEMS[token_type])
+                self.position += 1
+                continue
+            if token_type == 'CH;':
+                self.position += 1
+                continue
+
+            start = self.position
+            try:
+                item = self.statement()
+                # Tras un encabezado solo puede venir su bloque; tras una sentencia, ';' o '}'
+                following = types[self.position]
+                if isinstance(item, HEADER_TYPES):
+                    if following is not None and following != 'CH{' and following != 'CH;':
+                        raise self.unexpected("'{'")
+                elif following is not None and following != 'CH;' and following != 'CH}':
+                    self.check_adjacent_operand()
+                    raise self.unexpected("';'")
+            except ParseError as parse_error:
+                error = parse_error.message
+                # Si la sentencia con error era una asignación, el error también es el de su expresión
+                if assignment is None and (token_type == 'IDEN' or token_type in DECLARATION_TYPES) \
+                        and 'ASSGN' in types[start:]:
+                    assignment = ParsedAssignment('', error=error)
+                # Las llaves que quedan en la línea siguen abriendo y cerrando bloques
+                items.extend(BLOCK_ITEMS[other] for other in types[self.position:] if other in BLOCK_ITEMS)
+                break
+
+            items.append(item)
+            if assignment is None:
+                assignment = self.parsed_assignment(item, start)
+        return LineSyntax(tuple(items), error, assignment)
+
+    def parsed_assignment(self, item, start):
+        # Asignación o declaración con valor, con su texto sin espacios (destino=valor)
+        if isinstance(item, Assignment):
+            left_side = item.target.text
+        elif isinstance(item, VarDecl) and item.value is not None:
+            left_side = item.name
+            start += 1  # El tipo no forma parte de la expresión
+        else:
+            return None
+        # Como en los conversores de cadenas, es simple si la derecha es un único token
+        simple = self.position - self.types.index('ASSGN', start) == 2
+        return ParsedAssignment(self.text(start), left_side, item.value, simple=simple)
+
+    # Sentencias
+    def statement(self):
+        token = self.tokens[self.position]
+        token_type = token.type
+
+        if token_type in DECLARATION_TYPES:
+            return self.declaration()
+        if token_type == 'IF':
+            self.position += 1
+            return IfHeader(self.condition())
+        if token_type == 'ELIF':
+            self.position += 1
+            return ElseHeader(self.condition())
+        if token_type == 'ELSE':
+            self.position += 1
+            if self.accept('IF'):
+                return ElseHeader(self.condition())
+            return ElseHeader()
+        if token_type == 'WHI':
+            self.position += 1
+            return WhileHeader(self.condition())
+        if token_type == 'DO':
+            self.position += 1
+            return DoHeader()
+        if token_type == 'FOR':
+            return self.for_header()
+        if token_type == 'FCTN':
+            return self.function_header()
+        if token_type == 'TRY':
+            self.position += 1
+            return TryHeader()
+        if token_type == 'CTCH':
+            return self.catch_header()
+        if token_type == 'RTRN':
+            self.position += 1
+            if self.check(None, 'CH;', 'CH}'):
+                return Return(None)
+            return Return(self.expression())
+        if token_type == 'CNTN':
+            self.position += 1
+            return Continue()
+        if token_type == 'CLEAR':
+            self.position += 1
+            if self.accept('CH('):
+                self.expect('CH)', "')'")
+            return Clear()
+        if token_type in ('OUT', 'INP'):
+            if self.types[self.position + 1] != 'CH(':
+                raise ParseError(f"Se esperaba '(' después de {token.value}")
+            call = self.expression()
+            if not isinstance(call, Call):
+                raise ParseError("Estructura no reconocida")
+            return Output(call.arguments) if token_type == 'OUT' else Input(call.arguments)
+        return self.simple_statement()
+
+    def declaration(self):
+        type_token = self.advance()
+        name = self.accept('IDEN')
+        if name is None:
+            raise ParseError("Error en declaración de variable")
+        value = None
+        if self.accept('ASSGN'):
+            value = self.expression()
+        return VarDecl(type_token.value, name.value, value)
+
+    def simple_statement(self):
+        # Asignación (x = expr, x[i] = expr) o llamada suelta
+        target = self.expression()
+        if self.accept('ASSGN'):
+            if not isinstance(target, (Name, Index)):
+                raise ParseError("Destino de asignación no válido")
+            return Assignment(target, self.expression())
+        if isinstance(target, Call):
+            return ExpressionStatement(target)
+        raise ParseError("Estructura no reconocida")
+
+    def condition(self):
+        self.expect('CH(', "'('")
+        condition = self.expression()
+        self.expect('CH)', "')'")
+        return condition
+
+    def for_header(self):
+        self.position += 1
+        self.expect('CH(', "'('")
+        init = None
+        if not self.check('CH;'):
+            init = self.declaration() if self.check(*DECLARATION_TYPES) else self.simple_statement()
+        self.expect('CH;', "';' después de la inicialización del for")
+        condition = None if self.check('CH;') else self.expression()
+        self.expect('CH;', "';' después de la condición del for")
+        update = None if self.check('CH)') else self.simple_statement()
+        self.expect('CH)', "')'")
+        return ForHeader(init, condition, update)
+
+    def function_header(self):
+        self.position += 1
+        return_type = self.advance().value if self.check(*DECLARATION_TYPES) else None
+        name = self.expect('IDEN', "el nombre de la función")
+        self.expect('CH(', "'(' para los parámetros")
+        parameters = []
+        if not self.check('CH)'):
+            while True:
+                param_type = self.advance().value if self.check(*DECLARATION_TYPES) else None
+                param = self.expect('IDEN', "un parámetro")
+                parameters.append(Parameter(param_type, param.value))
+                if not self.accept('CH,'):
+                    break
+        self.expect('CH)', "')' al final de los parámetros")
+        return FunctionHeader(return_type, name.value, parameters)
+
+    def catch_header(self):
+        self.position += 1
+        error_name = None
+        if self.accept('CH('):
+            name = self.accept('IDEN')
+            error_name = name.value if name is not None else None
+            self.expect('CH)', "')'")
+        return CatchHeader(error_name)
+
+    # Expresiones
+    def binary_operator(self):
+        # (operador, tokens que ocupa) del operador binario que sigue, o None
+        types = self.types
+        token_type = types[self.position]
+        pair = (token_type, types[self.position + 1])
+        if pair in COMPOUND_OPERATORS:
+            return COMPOUND_OPERATORS[pair], 2
+        if token_type in SINGLE_OPERATORS:
+            if pair[1] == 'ASSGN' and token_type in COMPOUND_ASSIGNMENT_TYPES:
+                raise ParseError("operador compuesto no soportado")
+            return SINGLE_OPERATORS[token_type], 1
+        # "_a -1": el lexer une el signo al número, pero aquí es una resta
+        if token_type in SIGNED_TYPES:
+            sign = self.tokens[self.position].value[0]
+            if sign in '+-':
+                return sign, 0
+        return None
+
+    def expression(self):
+        # Precedencia de operadores con pilas explícitas. `operators` guarda los
+        # operadores pendientes y las agrupaciones abiertas (paréntesis, llamadas,
+        # índices y listas), que hacen de tope al reducir.
+        tokens = self.tokens
+        types = self.types
+        operands = []
+        operators = []
+        expect_operand = True
+        while True:
+            position = self.position
+            token_type = types[position]
+            if expect_operand:
+                if token_type is None:
+                    raise ParseError("Expresión incompleta")
+                if token_type in UNARY_OPERATORS:
+                    self.position += 1
+                    operators.append((UNARY, UNARY_PRECEDENCE, UNARY_OPERATORS[token_type]))
+                    continue
+                if token_type == 'IDEN' and types[position + 1] != 'CH(':
+                    self.position += 1
+                    operands.append(Name(tokens[position].value))
+                elif token_type in LITERAL_TYPES:
+                    self.position += 1
+                    value = tokens[position].value
+                    if self.unsigned_next:
+                        value = value[1:]
+                        self.unsigned_next = False
+                    operands.append(Literal(LITERAL_TYPES[token_type], value))
+                elif token_type in CALLABLE_TYPES and types[position + 1] == 'CH(':
+                    self.position += 2
+                    if types[position + 2] != 'CH)':
+                        operators.append((CALL, position, tokens[position].value, []))
+                        continue
+                    self.position += 1
+                    operands.append(Call(tokens[position].value, [], self.text(position)))
+                elif token_type == 'CH(':
+                    self.position += 1
+                    operators.append((GROUP, position))
+                    continue
+                elif token_type == 'CH[':
+                    self.position += 1
+                    if types[position + 1] != 'CH]':
+                        operators.append((LIST, position, []))
+                        continue
+                    self.position += 1
+                    operands.append(ListLiteral([], self.text(position)))
+                else:
+                    raise self.unexpected("una expresión")
+                expect_operand = False
+                continue
+
+            # Tras un operando: operador binario, índice, separador o cierre de agrupación
+            operator = self.binary_operator() if token_type is not None else None
+            if operator is not None:
+                symbol, width = operator
+                precedence = BINARY_PRECEDENCE[symbol]
+                if operators and operators[-1][0] <= UNARY and operators[-1][1] > precedence:
+                    reduce_operators(operands, operators, precedence)
+                operators.append((BINARY, precedence, symbol))
+                self.position += width
+                self.unsigned_next = width == 0
+                expect_operand = True
+                continue
+
+            self.check_adjacent_operand()
+            if token_type == 'CH[' and isinstance(operands[-1], (Name, Call, Index)):
+                operators.append((INDEX, position, operands.pop()))
+                self.position += 1
+                expect_operand = True
+                continue
+            if token_type != 'CH,' and token_type != 'CH)' and token_type != 'CH]':
+                break
+            reduce_operators(operands, operators, 0)
+            if not operators:
+                break  # El separador o cierre pertenece a la sentencia (p. ej. la condición de un if)
+
+            frame = operators[-1]
+            kind = frame[0]
+            if token_type == 'CH,' and (kind == CALL or kind == LIST):
+                frame[-1].append(operands.pop())
+                self.position += 1
+                expect_operand = True
+                continue
+            if token_type != CLOSING_TOKENS[kind]:
+                raise self.unexpected(CLOSING_VALUES[CLOSING_TOKENS[kind]])
+            operators.pop()
+            self.position += 1
+            inner = operands.pop()
+            if kind == GROUP:
+                operands.append(inner)
+            elif kind == CALL:
+                frame[3].append(inner)
+                operands.append(Call(frame[2], frame[3], self.text(frame[1])))
+            elif kind == LIST:
+                frame[2].append(inner)
+                operands.append(ListLiteral(frame[2], self.text(frame[1])))
+            else:
+                target = frame[2]
+                operands.append(Index(target, inner, target.text + self.text(frame[1])))
+
+        reduce_operators(operands, operators, 0)
+        if operators:
+            raise self.unexpected(CLOSING_VALUES[CLOSING_TOKENS[operators[-1][0]]])
+        return operands[0]
+
+
+def reduce_operators(operands, operators, precedence):
+    # Aplica los operadores pendientes de mayor precedencia que `precedence`, hasta
+    # la agrupación abierta más interna
+    while operators and operators[-1][0] <= UNARY and operators[-1][1] > precedence:
+        kind, _, symbol = operators.pop()
+        if kind == UNARY:
+            operands.append(UnaryOp(symbol, operands.pop()))
+        else:
+            right = operands.pop()
+            operands.append(BinaryOp(symbol, operands.pop(), right))
+
+
+def parse_statements(tokens):
+    # LineSyntax de una línea a partir de sus tokens (solo se usan tipo y valor)
+    return LineParser(tokens).parse()
+
+
+def build_program(lines):
+    # Une las sentencias de cada línea en bloques. `lines` da pares (número de línea,
+    # LineSyntax). Devuelve el Program y el primer error de sintaxis de cada línea:
+    # el de la propia línea o uno de estructura (llaves, else, do-while, try-catch)
+    program = Program()
+    errors = {}
+    frames = []  # Bloques abiertos: (encabezado, línea del encabezado, estructura a completar, bloque)
+    pending = None  # Encabezado que espera su bloque: (encabezado, línea, estructura a completar)
+    follow = None  # Estructura recién cerrada que admite continuación: If, DoWhile o TryCatch
+
+    def error(line, message):
+        errors.setdefault(line, message)
+
+    def current():
+        return frames[-1][3].statements if frames else program.statements
+
+    for line, syntax in lines:
+        if syntax.error is not None:
+            errors[line] = syntax.error
+        for item in syntax.items:
+            # Continuación de la estructura anterior: else, while del do, catch del try
+            if follow is not None:
+                previous, follow = follow, None
+                if isinstance(previous, If) and isinstance(item, ElseHeader):
+                    pending = (item, line, previous)
+                    continue
+                if isinstance(previous, DoWhile):
+                    if isinstance(item, WhileHeader):
+                        previous.condition = item.condition
+                        continue
+                    error(previous.line, "Se esperaba 'while' después del bloque do")
+                elif isinstance(previous, TryCatch):
+                    if isinstance(item, CatchHeader):
+                        pending = (item, line, previous)
+                        continue
+                    error(previous.line, "Se esperaba 'catch' después del bloque try")
+
+            if pending is not None:
+                if isinstance(item, BlockStart):
+                    frames.append(pending + (Block([], line, line),))
+                    pending = None
+                    continue
+                error(pending[1], f"Se esperaba '{{' después de {pending[0].keyword}")
+                pending = None
+
+            if isinstance(item, BlockStart):
+                frames.append((None, line, None, Block([], line, line)))
+            elif isinstance(item, BlockEnd):
+                if not frames:
+                    error(line, "Llave de cierre sin bloque abierto")
+                    continue
+                header, header_line, target, block = frames.pop()
+                block.end_line = line
+                follow = close_block(header, header_line, target, block, current())
+            elif isinstance(item, HEADER_TYPES):
+                if isinstance(item, ElseHeader):
+                    error(line, "else sin if previo")
+                elif isinstance(item, CatchHeader):
+                    error(line, "catch sin try previo")
+                pending = (item, line, None)
+            else:
+                current().append(item)
+
+    if pending is not None:
+        error(pending[1], f"Se esperaba '{{' después de {pending[0].keyword}")
+    if isinstance(follow, DoWhile):
+        error(follow.line, "Se esperaba 'while' después del bloque do")
+    elif isinstance(follow, TryCatch):
+        error(follow.line, "Se esperaba 'catch' después del bloque try")
+    for _, _, _, block in frames:
+        error(block.line, "Bloque sin cerrar")
+    return program, errors
+
+
+def close_block(header, line, target, block, statements):
+    # Completa la estructura del bloque que se cierra y devuelve la que admite
+    # continuación (o None). `target` es el If o TryCatch que continúa un else o catch.
+    if isinstance(header, ElseHeader) and target is not None:
+        if header.condition is None:
+            target.orelse = block
+            return None
+        node = If(header.condition, block, None, line)
+        target.orelse = node
+        return node
+    if isinstance(header, CatchHeader) and target is not None:
+        target.error_name = header.error_name
+        target.handler = block
+        return None
+
+    node = block  # Bloque suelto, o el de un else o catch sin estructura previa
+    if isinstance(header, IfHeader):
+        node = If(header.condition, block, None, line)
+    elif isinstance(header, WhileHeader):
+        node = While(header.condition, block, line)
+    elif isinstance(header, ForHeader):
+        node = For(header.init, header.condition, header.update, block, line)
+    elif isinstance(header, FunctionHeader):
+        node = FunctionDecl(header.return_type, header.name, header.parameters, block, line)
+    elif isinstance(header, DoHeader):
+        node = DoWhile(block, None, line)
+    elif isinstance(header, TryHeader):
+        node = TryCatch(block, None, None, line)
+    statements.append(node)
+    return node if isinstance(node, (If, DoWhile, TryCatch)) else None
+
+
+# Conversión de asignaciones a notación prefija y tripletas, como recorridos del
+# árbol de la expresión. Las líneas del código llegan ya analizadas (LineSyntax);
+# parse_assignment analiza una asignación dada como texto, dividiendo en el operador
+# de menor precedencia más a la izquierda que queda fuera de paréntesis.
+
+EXPRESSION_ATOM = re.compile(r'[a-zA-Z0-9_]+|[+\-*/()]')
+WORD_ATOM = re.compile(r'[a-zA-Z0-9_]+')
+ATOM_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+
+OPERATOR_DESCRIPTIONS = {
+    '+': 'suma',
+    '-': 'resta',
+    '*': 'multiplica',
+    '/': 'divide'
+}
+
+@dataclass
+class Operand:
+    text: str
+
+
+def parse_assignment(expression, build_tree=True):
+    # Primero separamos la parte izquierda y derecha de la asignación
+    parts = expression.split('=')
+    if len(parts) < 2:
+        return ParsedAssignment(expression)
+
+    left_side = parts[0].strip()
+    right_side = parts[1].strip()
+
+    # Eliminar comentarios si existen
+    if '//' in right_side:
+        right_side = right_side.split('//')[0].strip()
+
+    # Verificar si hay operadores compuestos (+=, -=, etc.)
+    if left_side.endswith('+') or left_side.endswith('-') or left_side.endswith('*') or left_side.endswith('/'):
+        return ParsedAssignment(expression, left_side, error="operador compuesto no soportado")
+
+    atoms = EXPRESSION_ATOM.findall(right_side)
+
+    # Verificar si hay tokens adyacentes sin operador entre ellos
+    for i in range(len(atoms) - 1):
+        if WORD_ATOM.match(atoms[i]) and WORD_ATOM.match(atoms[i+1]):
+            return ParsedAssignment(expression, left_side, error=f"falta operador entre {atoms[i]} y {atoms[i+1]}")
+
+    # Sin árbol basta para saber si la asignación tiene errores
+    tree = build_expression_tree(atoms) if build_tree else None
+    return ParsedAssignment(expression, left_side, tree, len(atoms) == 1)
+
+
+def build_expression_tree(atoms):
+    # Cada subexpresión se divide en el operador de menor precedencia más a la
+    # izquierda que queda fuera de paréntesis. Un operador en la posición i está
+    # fuera de paréntesis dentro de atoms[l:r] si la profundidad antes de i es
+    # igual a la profundidad en r, así que basta con indexar una vez las
+    # posiciones de los operadores por (profundidad, precedencia).
+    depths = []
+    operator_positions = {}
+    depth = 0
+    for i, atom in enumerate(atoms):
+        depths.append(depth)
+        if atom == '(':
+            depth += 1
+        elif atom == ')':
+            depth -= 1
+        elif atom in ATOM_PRECEDENCE:
+            operator_positions.setdefault((depth, ATOM_PRECEDENCE[atom]), []).append(i)
+    depths.append(depth)
+
+    def split_index(start, end):
+        for precedence in (1, 2):
+            positions = operator_positions.get((depths[end], precedence))
+            if positions:
+                k = bisect_left(positions, start)
+                if k < len(positions) and positions[k] < end:
+                    return positions[k]
+        return -1
+
+    # Pila explícita de (inicio, fin, nodo padre, lado) para no depender de la recursión
+    root = BinaryOp(None)
+    stack = [(0, len(atoms), root, 'left')]
+    while stack:
+        start, end, parent, side = stack.pop()
+        while True:
+            if start == end:
+                node = Operand('')
+            elif end - start == 1:
+                # Si solo hay un token, devolverlo
+                node = Operand(atoms[start])
+            else:
+                index = split_index(start, end)
+                if index != -1:
+                    node = BinaryOp(atoms[index])
+                    stack.append((index + 1, end, node, 'right'))
+                    stack.append((start, index, node, 'left'))
+                elif atoms[start] == '(' and atoms[end - 1] == ')':
+                    # Quitar paréntesis externos y procesar el contenido
+                    start += 1
+                    end -= 1
+                    continue
+                else:
+                    # Si no hay operadores ni paréntesis, devolver los tokens como están
+                    node = Operand(' '.join(atoms[start:end]))
+            break
+        setattr(parent, side, node)
+    return root.left
+
+
+def assignment_to_prefix(parsed):
+    if parsed.left_side is None:
+        return parsed.expression
+    if parsed.error is not None:
+        separator = '=' if parsed.error == "operador compuesto no soportado" else ' ='
+        return f"{parsed.left_side}{separator} ERROR: {parsed.error}"
+    return f"{parsed.left_side} = {tree_to_prefix(parsed.tree)}"
+
+
+def tree_to_prefix(node):
+    # Recorrido en preorden; un operando vacío deja su hueco entre espacios
+    pieces = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, BinaryOp):
+            pieces.append(node.operator)
+            stack.append(node.right)
+            stack.append(node.left)
+        elif isinstance(node, UnaryOp):
+            pieces.append(node.operator)
+            stack.append(node.operand)
+        else:
+            pieces.append(node.text)
+    return ' '.join(pieces)
+
+
+def assignment_to_triplets(parsed):
+    triplets = []
+    if parsed.left_side is None or parsed.error is not None:
+        return triplets
+
+    left_side = parsed.left_side
+
+    # Caso simple: asignación directa
+    if parsed.simple:
+        source = parsed.tree.text
+        triplets.append({
+            'object': left_side,
+            'source': source,
+            'operator': '=',
+            'description': f"Asigna el valor de {source} a {left_side}"
+        })
+        return triplets
+
+    # Caso complejo: expresión con operadores
+    result, _ = tree_to_triplets(parsed.tree, 1, triplets)
+
+    # Agregar la asignación final
+    triplets.append({
+        'object': left_side,
+        'source': result,
+        'operator': '=',
+        'description': f"Se asigna el resultado final a {left_side}"
+    })
+    return triplets
+
+
+def tree_to_triplets(node, temp_var_counter, triplets):
+    # Recorrido en postorden: cada operador binario toma la siguiente variable temporal
+    # y un operador unario se antepone al resultado de su operando
+    results = []
+    stack = [(node, False)]
+    while stack:
+        node, operands_ready = stack.pop()
+        if isinstance(node, UnaryOp):
+            if operands_ready:
+                results.append(node.operator + results.pop())
+            else:
+                stack.append((node, True))
+                stack.append((node.operand, False))
+            continue
+        if not isinstance(node, BinaryOp):
+            results.append(node.text)
+            continue
+        if not operands_ready:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+            continue
+
+        right_result = results.pop()
+        left_result = results.pop()
+
+        # Crear una nueva variable temporal
+        temp_var = f"T{temp_var_counter}"
+        temp_var_counter += 1
+
+        # No necesitamos una tripleta adicional si el resultado izquierdo ya es una variable temporal
+        if not left_result.startswith('T'):
+            triplets.append({
+                'object': temp_var,
+                'source': left_result,
+                'operator': '=',
+                'description': f"Asigna el valor de {left_result} a una variable temporal"
+            })
+
+        triplets.append({
+            'object': temp_var,
+            'source': right_result,
+            'operator': node.operator,
+            'description': f"Se {OPERATOR_DESCRIPTIONS.get(node.operator, 'opera')} el valor de {right_result} a la variable temporal"
+        })
+        results.append(temp_var)
+    return results[0], temp_var_counter
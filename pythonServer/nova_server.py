@@ -0,0 +1,62 @@
+import argparse
+import os
+
+# Servidor de producción para la API de análisis: gunicorn con procesos
+# pre-forked. La aplicación (patrones, expresiones regulares compiladas y tabla
+# del DFA) se carga una sola vez en el proceso maestro antes de crear los workers.
+#
+# Reinicio sin cortar peticiones: `kill -HUP <pid del maestro>` levanta workers
+# nuevos y deja terminar a los anteriores; SIGTERM apaga de forma ordenada.
+
+
+def build_application(options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("nova-server necesita gunicorn: pip install gunicorn")
+
+    class NovaServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            # Precargar antes del fork: los workers comparten el código ya compilado
+            from main import app
+            self.application = app
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    return NovaServer(options)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="nova-server", description="Servidor de producción del analizador de Nova")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesos worker (por defecto, uno por CPU)")
+    parser.add_argument("--threads", type=int, default=1, help="hilos por worker")
+    parser.add_argument("--timeout", type=int, default=60, help="segundos antes de reiniciar un worker bloqueado")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="segundos para terminar peticiones en curso al reiniciar")
+    parser.add_argument("--max-requests", type=int, default=0, help="reciclar cada worker tras N peticiones (0 = nunca)")
+    args = parser.parse_args()
+
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread" if args.threads > 1 else "sync",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests // 10,
+        "preload_app": True,
+    }
+    build_application(options).run()
+
+
+if __name__ == "__main__":
+    main()
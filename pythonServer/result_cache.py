@@ -0,0 +1,156 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+# Caché LRU de respuestas ya serializadas, indexada por el hash del código.
+# Se limita por número de entradas, por bytes totales y por antigüedad (TTL).
+# Cada entrada puede guardar además variantes de su cuerpo (p. ej. comprimidas):
+# cuentan en los bytes de la entrada pero no en los aciertos ni fallos.
+
+
+def content_key(text):
+    # surrogatepass: el código puede traer surrogates sueltos (p. ej. JSON con "\ud800")
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # clave -> (bytes, instante de inserción, variantes)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry[1] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, body):
+        # Una respuesta más grande que todo el presupuesto no se guarda
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, self.clock(), {})
+            self._size += len(body)
+            self._evict()
+
+    def get_variant(self, key, name):
+        # Variante guardada con put_variant; no cambia las estadísticas ni el orden LRU
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self.clock() - entry[1] > self.ttl:
+                return None
+            return entry[2].get(name)
+
+    def put_variant(self, key, name, body):
+        # Solo se guarda si la entrada principal sigue en la caché
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or name in entry[2]:
+                return
+            entry[2][name] = body
+            self._size += len(body)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        body, _, variants = self._entries.pop(key)
+        self._size -= len(body) + sum(len(variant) for variant in variants.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class LineCache:
+    # Caché LRU de resultados por línea, indexada por el texto de la línea. Se limita
+    # por número de entradas y por bytes; el tamaño de cada entrada lo estima quien la guarda.
+    def __init__(self, max_entries=20000, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # texto -> (entrada, bytes estimados)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, line_text):
+        with self._lock:
+            item = self._entries.get(line_text)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(line_text)
+            self.hits += 1
+            return item[0]
+
+    def put(self, line_text, entry, size):
+        # Una entrada más grande que todo el presupuesto no se guarda
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(line_text, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[line_text] = (entry, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
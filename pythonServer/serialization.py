@@ -0,0 +1,76 @@
+import gzip
+import json
+from json.encoder import encode_basestring_ascii
+import zlib
+
+# Serialización de las respuestas del análisis. Los tokens se escriben directamente
+# desde los objetos Token (sin crear un dict por token) y el resto de secciones con
+# el codificador más rápido disponible: orjson si está instalado, si no `json`.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Respuestas más pequeñas no se comprimen: el encabezado pesa más que el ahorro
+MIN_COMPRESS_BYTES = 1024
+COMPRESSION_LEVEL = 6
+
+
+def encode_json(obj):
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except orjson.JSONEncodeError:
+            pass  # p. ej. surrogates sueltos en el código: se escapan con `json`
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("ascii")
+
+
+def encode_tokens(tokens):
+    # Mismas claves que Token.to_dict(), en orden alfabético como el resto de la respuesta.
+    # Los valores se repiten mucho (están internados), así que su codificación se memoriza;
+    # los tipos son nombres fijos en ASCII y no necesitan escaparse.
+    encoded_values = {}
+    parts = []
+    append = parts.append
+    for token in tokens:
+        value = encoded_values.get(token.value)
+        if value is None:
+            value = encoded_values[token.value] = encode_basestring_ascii(token.value)
+        if token.type == "IDEN":
+            append(f'{{"id":{token.id},"line":{token.line},"type":"IDEN","value":{value}}}')
+        else:
+            append(f'{{"line":{token.line},"type":"{token.type}","value":{value}}}')
+    return ("[" + ",".join(parts) + "]").encode("ascii")
+
+
+def encode_response(sections, tokens=None):
+    # Objeto JSON con las secciones ya calculadas; `tokens` es la lista de Token del lexer
+    encoded = {name: encode_json(data) for name, data in sections.items()}
+    if tokens is not None:
+        encoded["tokens"] = encode_tokens(tokens)
+    return b"{" + b",".join(
+        encode_basestring_ascii(name).encode("ascii") + b":" + encoded[name] for name in sorted(encoded)
+    ) + b"}"
+
+
+def negotiate_encoding(accept_encoding):
+    # Primera codificación soportada (gzip o deflate) aceptada por el cliente
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in ("gzip", "deflate"):
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=COMPRESSION_LEVEL)
+    if encoding == "deflate":
+        return zlib.compress(body, COMPRESSION_LEVEL)
+    return body
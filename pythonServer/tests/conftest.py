@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos del servidor son planos (main, serialization, ...): se importan desde pythonServer/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
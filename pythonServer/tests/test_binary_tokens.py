@@ -0,0 +1,76 @@
+import pytest
+
+import binary_tokens
+from binary_tokens import decode_binary_response, encode_binary_response, read_varint, write_varint
+from main import Lexer, app
+
+PROGRAMS = [
+    "",
+    "int _a = 5;",
+    "int _a = 5;\n_a = _a + 1;\noutput(_a);",
+    # No ASCII en cadenas, comentarios y texto no reconocido
+    'string _s = "canción ñandú";  // comentario con acentos: áéíóú\n_ñ = 3;\noutput(_s);',
+    # Fuera del plano básico (surrogates en UTF-16)
+    'string _e = "😀 𝔘𝔫𝔦𝔠𝔬𝔡𝔢";\n// 🚀🚀\n_e = "🎉" + _e;\n😀 _x = 1;',
+    # Líneas vacías, tabulaciones y CRLF
+    "\n\n\tint _a = 1;\r\n\n   _a = _a * (2 - 3) / 4;\n\n",
+    "if (_a > 3) {\n  output(\"x\");\n} else {\n  _b = _a @ 2;\n}\n",
+]
+
+
+def tokenize(code, fields=None, binary=False):
+    client = app.test_client()
+    headers = {"Accept": binary_tokens.MEDIA_TYPE} if binary else {}
+    url = "/tokenize" + (f"?fields={fields}" if fields else "")
+    response = client.post(url, json={"code": code}, headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+@pytest.mark.parametrize("value", [0, 1, 0x7F, 0x80, 0x3FFF, 0x4000, 2 ** 32 + 5])
+def test_varint_round_trip(value):
+    out = bytearray()
+    write_varint(out, value)
+    assert read_varint(bytes(out), 0) == (value, len(out))
+
+
+@pytest.mark.parametrize("code", PROGRAMS)
+def test_binary_response_matches_json(code):
+    expected = tokenize(code).get_json()
+    response = tokenize(code, binary=True)
+    assert response.mimetype == binary_tokens.MEDIA_TYPE
+    assert decode_binary_response(response.data, code) == expected
+
+
+@pytest.mark.parametrize("fields", ["tokens", "identificadores,tokens", "errores,syntaxResults", "scopes"])
+def test_binary_response_with_field_subsets(fields):
+    code = PROGRAMS[4]
+    expected = tokenize(code, fields).get_json()
+    decoded = decode_binary_response(tokenize(code, fields, binary=True).data, code)
+    assert decoded == expected
+    assert ("tokens" in decoded) == ("tokens" in fields.split(","))
+
+
+def test_encode_binary_response_round_trip():
+    code = PROGRAMS[3] + "\n" + PROGRAMS[4]
+    lex = Lexer(code)
+    lex.tokenize()
+    sections = {"identificadores": lex.get_identifiers_info()}
+    decoded = decode_binary_response(encode_binary_response(sections, lex), code)
+    assert decoded["identificadores"] == sections["identificadores"]
+    assert decoded["tokens"] == [token.to_dict() for token in lex.get_tokens()]
+    assert decode_binary_response(encode_binary_response(sections), code) == sections
+
+
+def test_many_types_and_long_values():
+    # Identificadores con IDs de varios bytes y valores largos fuera de un byte
+    code = "\n".join(f"int _v{i} = {i};" for i in range(300)) + '\nstring _s = "' + "ü" * 500 + '";'
+    lex = Lexer(code)
+    lex.tokenize()
+    decoded = decode_binary_response(encode_binary_response({}, lex), code)
+    assert decoded["tokens"] == [token.to_dict() for token in lex.get_tokens()]
+
+
+def test_rejects_other_payloads():
+    with pytest.raises(ValueError):
+        decode_binary_response(b'{"tokens":[]}', "")
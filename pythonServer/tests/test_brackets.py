@@ -0,0 +1,59 @@
+import pytest
+
+from main import BracketIndex, Lexer
+
+
+def analyze(code):
+    lex = Lexer(code)
+    lex.tokenize()
+    lex.detect_errors()
+    return lex
+
+
+def unmatched_symbols(code):
+    lex = analyze(code)
+    return [(lex.tokens[index].value, lex.tokens[index].line) for index in lex.bracket_index.unmatched]
+
+
+def error_types(code):
+    return {error['type'] for error in analyze(code).errors}
+
+
+def test_balanced_brackets_are_paired():
+    lex = analyze("if (_a > 3) {\n  _b = [(1), [2]];\n}")
+    index = lex.bracket_index
+    assert index.unmatched == []
+    for i, token in enumerate(lex.tokens):
+        if token.type in ('CH(', 'CH)', 'CH{', 'CH}', 'CH[', 'CH]'):
+            assert index.partner[index.partner[i]] == i
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("if (_a > 3 {\n  _a = 1;\n}\n)", [("(", 1), (")", 4)]),
+    ("{ ( } )", [("(", 1), (")", 1)]),
+    ("while (_a[1) ]", [("(", 1), ("[", 1), (")", 1), ("]", 1)]),
+    ("output(_a;\n{ }\n)", [("(", 1), (")", 3)]),
+    ("{\n  _a = 1;\n", [("{", 1)]),
+    ("_a = 1; }", [("}", 1)]),
+])
+def test_crossed_brackets_are_unmatched(code, expected):
+    assert unmatched_symbols(code) == expected
+
+
+@pytest.mark.parametrize("code, error_type", [
+    ("if (_a > 3 {\n  _a = 1;\n}\n)", 'INCOMPLETE_CONDITION'),
+    ("while (_a[1) ]", 'INCOMPLETE_CONDITION'),
+    ("output(_a;\n{ }\n)", 'INCOMPLETE_OUTPUT'),
+])
+def test_structures_do_not_borrow_closers_from_other_statements(code, error_type):
+    types = error_types(code)
+    assert error_type in types
+    assert 'SYMBOL_IMBALANCE' in types
+
+
+def test_closing_only_for_open_parenthesis():
+    lex = analyze("output(_a);")
+    closing = BracketIndex(lex.tokens).closing
+    assert lex.tokens[closing(1, lex.tokens)].value == ")"
+    assert closing(0, lex.tokens) == -1
+    assert closing(99, lex.tokens) == -1
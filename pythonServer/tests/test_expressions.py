@@ -0,0 +1,169 @@
+import random
+import re
+
+import pytest
+
+from main import generate_triplets, infix_to_prefix
+
+# Conversores recursivos originales (antes del recorrido en tiempo lineal), como referencia.
+# Dividen en el operador de menor precedencia más a la izquierda fuera de paréntesis.
+
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+OPERATOR_DESCRIPTIONS = {'+': 'suma', '-': 'resta', '*': 'multiplica', '/': 'divide'}
+
+
+def split_assignment(expression):
+    parts = expression.split('=')
+    if len(parts) < 2:
+        return None
+    left_side = parts[0].strip()
+    right_side = parts[1].strip()
+    if '//' in right_side:
+        right_side = right_side.split('//')[0].strip()
+    return left_side, right_side
+
+
+def adjacent_operands(tokens):
+    for i in range(len(tokens) - 1):
+        if re.match(r'[a-zA-Z0-9_]+', tokens[i]) and re.match(r'[a-zA-Z0-9_]+', tokens[i + 1]):
+            return tokens[i], tokens[i + 1]
+    return None
+
+
+def split_index(tokens):
+    min_precedence_idx = -1
+    min_precedence = float('inf')
+    parentheses_level = 0
+    for i in range(len(tokens) - 1, -1, -1):
+        token = tokens[i]
+        if token == ')':
+            parentheses_level += 1
+        elif token == '(':
+            parentheses_level -= 1
+        if parentheses_level == 0 and token in PRECEDENCE and PRECEDENCE[token] <= min_precedence:
+            min_precedence = PRECEDENCE[token]
+            min_precedence_idx = i
+    return min_precedence_idx
+
+
+def reference_prefix(expression):
+    parts = split_assignment(expression)
+    if parts is None:
+        return expression
+    left_side, right_side = parts
+    if left_side.endswith(('+', '-', '*', '/')):
+        return f"{left_side}= ERROR: operador compuesto no soportado"
+    tokens = re.findall(r'[a-zA-Z0-9_]+|[+\-*/()]', right_side)
+    pair = adjacent_operands(tokens)
+    if pair:
+        return f"{left_side} = ERROR: falta operador entre {pair[0]} y {pair[1]}"
+
+    def convert(tokens):
+        if not tokens:
+            return ''
+        if len(tokens) == 1:
+            return tokens[0]
+        index = split_index(tokens)
+        if index == -1:
+            if tokens[0] == '(' and tokens[-1] == ')':
+                return convert(tokens[1:-1])
+            return ' '.join(tokens)
+        return f"{tokens[index]} {convert(tokens[:index])} {convert(tokens[index + 1:])}"
+
+    return f"{left_side} = {convert(tokens)}"
+
+
+def reference_triplets(expression):
+    triplets = []
+    parts = split_assignment(expression)
+    if parts is None:
+        return triplets
+    left_side, right_side = parts
+    if left_side.endswith(('+', '-', '*', '/')):
+        return triplets
+    tokens = re.findall(r'[a-zA-Z0-9_]+|[+\-*/()]', right_side)
+    if adjacent_operands(tokens):
+        return triplets
+
+    def generate(tokens, counter=1):
+        if not tokens:
+            return '', counter
+        if len(tokens) == 1:
+            return tokens[0], counter
+        index = split_index(tokens)
+        if index == -1:
+            if tokens[0] == '(' and tokens[-1] == ')':
+                return generate(tokens[1:-1], counter)
+            return ' '.join(tokens), counter
+        operator = tokens[index]
+        left_result, counter = generate(tokens[:index], counter)
+        right_result, counter = generate(tokens[index + 1:], counter)
+        temp_var = f"T{counter}"
+        if not left_result.startswith('T'):
+            triplets.append({
+                'object': temp_var,
+                'source': left_result,
+                'operator': '=',
+                'description': f"Asigna el valor de {left_result} a una variable temporal"
+            })
+        triplets.append({
+            'object': temp_var,
+            'source': right_result,
+            'operator': operator,
+            'description': f"Se {OPERATOR_DESCRIPTIONS.get(operator, 'opera')} el valor de {right_result} a la variable temporal"
+        })
+        return temp_var, counter + 1
+
+    if len(tokens) == 1:
+        triplets.append({
+            'object': left_side,
+            'source': tokens[0],
+            'operator': '=',
+            'description': f"Asigna el valor de {tokens[0]} a {left_side}"
+        })
+        return triplets
+
+    result, _ = generate(tokens)
+    triplets.append({
+        'object': left_side,
+        'source': result,
+        'operator': '=',
+        'description': f"Se asigna el resultado final a {left_side}"
+    })
+    return triplets
+
+
+EXPRESSIONS = [
+    "_a = 5", "_a=_b", "_a = _b + _c", "_a = _b - _c - _d", "_a = _b * _c + _d / _e",
+    "_a = (_b + _c) * (_d - _e)", "_a = ((_b))", "_a = _b _c", "_a += 1", "_a = 3 // comentario",
+    "_a =", "= 3", "_a = _b = 3", "sin asignación", "_a = (1 + 2", "_a = 1 + 2)", "_a = T1 + T2",
+    "_a = -3 + +4", "_a = 1.5 * 2", "_a = ()", "_a = 1 + ", "_a = * 2",
+]
+
+
+@pytest.mark.parametrize("expression", EXPRESSIONS)
+def test_matches_recursive_converters(expression):
+    assert infix_to_prefix(expression) == reference_prefix(expression)
+    assert generate_triplets(expression) == reference_triplets(expression)
+
+
+def test_matches_recursive_converters_on_random_expressions():
+    atoms = ['_a', 'b', '3', '12', '+', '-', '*', '/', '(', ')', '=', '.', '%', 'T1', 'Tx', '//', '+=', ' ']
+    rng = random.Random(3)
+    for _ in range(5000):
+        expression = ''.join(rng.choice(atoms) for _ in range(rng.randint(0, 16)))
+        assert infix_to_prefix(expression) == reference_prefix(expression), expression
+        assert generate_triplets(expression) == reference_triplets(expression), expression
+
+
+def test_long_and_deeply_nested_expressions():
+    # Más allá del límite de recursión de los conversores originales
+    terms = 100000
+    flat = "_r = " + " + ".join(f"_v{i % 10} * {i}" for i in range(terms))
+    assert infix_to_prefix(flat).startswith("_r = + ")
+    assert len(generate_triplets(flat)) == 3 * terms
+
+    depth = 20000
+    nested = "_r = " + "(" * depth + "_a + 1" + ")" * depth
+    assert infix_to_prefix(nested) == "_r = + _a 1"
+    assert [triplet['operator'] for triplet in generate_triplets(nested)] == ['=', '+', '=']
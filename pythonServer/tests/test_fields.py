@@ -0,0 +1,21 @@
+import pytest
+
+from main import RESPONSE_FIELDS, app, parse_fields
+
+
+def test_parse_fields_accepts_strings_and_lists():
+    assert parse_fields(None) == RESPONSE_FIELDS
+    assert parse_fields("") == RESPONSE_FIELDS
+    assert parse_fields("tokens, errores") == ("tokens", "errores")
+    assert parse_fields(["scopes", "tokens"]) == ("tokens", "scopes")
+
+
+@pytest.mark.parametrize("fields", [5, True, {"tokens": 1}, [1], [None], ["tokens", 2], "tokens,nope"])
+@pytest.mark.parametrize("url, payload", [
+    ("/tokenize", {"code": "int _a = 1;"}),
+    ("/tokenize/batch", {"documents": [{"code": "int _a = 1;"}]}),
+])
+def test_malformed_fields_are_rejected(url, payload, fields):
+    response = app.test_client().post(url, json={**payload, "fields": fields})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
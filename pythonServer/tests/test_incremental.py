@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from main import Lexer, app
+
+SNIPPETS = [
+    "int _a = 5;", "double _b = 3.14;", 'string _s = "hola ñ 😀";', "_a = _a + _b * (3 - _c) / 2;",
+    "_x = _y _z;", "_a += 1;", "if (_a > 3) {", "} else {", "}", "{", "while (_a < 10) {",
+    "for (int _i = 0; _i < 10; _i = _i + 1) {", 'output("hola");', "output(", "input(_a);",
+    "function int _f() {", "return _a;", "return \"x\";", "// comentario", "_a = 3; // comentario",
+    "@ _a", "_a = (1 + 2", "[1, 2]", "", "   ", "\t_a = 2;",
+]
+
+
+def random_lines(rng, count):
+    return [rng.choice(SNIPPETS) for _ in range(count)]
+
+
+def state(lex):
+    # Lo que ve el cliente; los IDs de identificador se conservan entre ediciones, así que no se comparan
+    return (
+        [(token.type, token.value, token.line) for token in lex.tokens],
+        lex.errors,
+        lex.get_identifiers_info(),
+        [
+            {**line, "tokens": [(token["type"], token["value"], token["line"]) for token in line["tokens"]]}
+            for line in lex.get_line_results(1, len(lex.line_tokens))
+        ],
+    )
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_apply_edit_matches_fresh_lexer(seed):
+    rng = random.Random(seed)
+    lines = random_lines(rng, rng.randint(1, 25))
+    lex = Lexer("\n".join(lines))
+    lex.tokenize()
+    for _ in range(12):
+        start = rng.randint(1, len(lines) + 1)
+        end = rng.randint(start - 1, min(len(lines), start + 2))
+        new_lines = random_lines(rng, rng.randint(1, 3)) if rng.random() < 0.8 else [""]
+        lex.apply_edit(start, end, "\n".join(new_lines))
+        lines[start - 1:end] = new_lines
+
+        fresh = Lexer("\n".join(lines))
+        fresh.tokenize()
+        assert lex.text == fresh.text
+        assert len(lex.line_tokens) == len(lines)
+        assert state(lex) == state(fresh)
+
+
+def test_edit_results_report_shifted_lines():
+    lex = Lexer("int _a = 1;\n_a = _a + 1;\noutput(_a);")
+    lex.tokenize()
+    delta = lex.apply_edit(1, 1, "int _a = 1;\nint _b = 2;")
+    assert delta["lineShift"] == 1
+    assert [line["line"] for line in delta["lines"]] == [1, 2]
+    # Las líneas posteriores a la edición se renumeran aunque no se hayan vuelto a analizar
+    assert lex.get_line_tokens(4)[0].line == 4
+    assert {token.line for token in lex.tokens if token.value == "output"} == {4}
+
+
+def test_invalid_ranges_are_rejected():
+    lex = Lexer("int _a = 1;\n_a = 2;")
+    lex.tokenize()
+    for start, end in [(0, 1), (4, 3), (2, 3), (2, 0)]:
+        with pytest.raises(ValueError):
+            lex.apply_edit(start, end, "")
+
+
+def test_incremental_endpoint():
+    client = app.test_client()
+    opened = client.post("/tokenize/incremental", json={"code": "int _a = 1;\n_a = _a + 2;"}).get_json()
+    assert opened["lineCount"] == 2
+    document_id = opened["documentId"]
+
+    edit = {"documentId": document_id, "startLine": 2, "endLine": 2, "text": "_a = 3;\n_b = 4 @"}
+    edited = client.post("/tokenize/incremental", json=edit).get_json()
+    assert edited["lineCount"] == 3
+    assert [line["line"] for line in edited["lines"]] == [2, 3]
+    assert edited["lines"][1]["errors"]
+
+    unknown = client.post("/tokenize/incremental", json={**edit, "documentId": "desconocido"})
+    assert unknown.status_code == 404
+    invalid = client.post("/tokenize/incremental", json={**edit, "startLine": 9})
+    assert invalid.status_code == 400
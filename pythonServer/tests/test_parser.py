@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from main import Lexer, analyze_code
+from nova_parser import Assignment, BinaryOp, FunctionDecl, If, Name, While
+from test_expressions import reference_prefix, reference_triplets
+
+# La prefija y las tripletas salen del árbol construido con los tokens de la línea;
+# en expresiones bien formadas deben coincidir con los conversores de referencia.
+
+
+def random_expression(rng, depth=0):
+    if depth < 3 and rng.random() < 0.3:
+        return "(" + random_expression(rng, depth + 1) + ")"
+    terms = [rng.choice(['_a', '_b', '_c1', 'T1', '3', '12']) for _ in range(rng.randint(1, 5))]
+    if depth < 3 and rng.random() < 0.4:
+        terms[rng.randrange(len(terms))] = "(" + random_expression(rng, depth + 1) + ")"
+    expression = terms[0]
+    for term in terms[1:]:
+        # Con o sin espacios: "_b -3" llega al parser como "_b" y el número "-3"
+        expression += rng.choice(['', ' ']) + rng.choice('+-*/') + rng.choice(['', ' ']) + term
+    return expression
+
+
+def line_expression(line):
+    lex = Lexer(line)
+    lex.tokenize()
+    return lex.line_expression(1)
+
+
+def test_matches_reference_converters_on_random_expressions():
+    rng = random.Random(9)
+    for _ in range(2000):
+        line = "_r = " + random_expression(rng)
+        result = line_expression(line + ";")
+        expression = line.replace(" ", "")
+        assert result['expression'] == expression, line
+        assert result['prefix'] == reference_prefix(expression), line
+        assert result['triplets'] == reference_triplets(expression), line
+
+
+@pytest.mark.parametrize("line, prefix", [
+    ("double _p = 3.5;", "_p = 3.5"),
+    ('string _s = "a b";', '_s = "a b"'),
+    ("_a = -_b * 2;", "_a = * - _b 2"),
+    ("_a = _f(1, _b) + _v[2];", "_a = + _f(1,_b) _v[2]"),
+    ("_a = [1, 2];", "_a = [1,2]"),
+])
+def test_literals_and_operands(line, prefix):
+    assert line_expression(line)['prefix'] == prefix
+
+
+@pytest.mark.parametrize("line, message", [
+    ("_a = _b _c;", "Falta operador entre _b y _c"),
+    ("_a = (1 + 2;", "Se esperaba ')' y se encontró ';'"),
+    ("_a = 1 +;", "Se esperaba una expresión y se encontró ';'"),
+    ("_a += 1;", "operador compuesto no soportado"),
+    ("int = 3;", "Error en declaración de variable"),
+])
+def test_expression_errors(line, message):
+    assert line_expression(line) == {'error': message}
+    result = analyze_code(line)
+    assert result['syntaxResults'] == [{'line': 1, 'valid': False, 'message': f"Error sintáctico en línea 1: {message}"}]
+
+
+def syntax_errors(code):
+    return {result['line']: result['message'].split(': ', 1)[1]
+            for result in analyze_code(code, fields=("syntaxResults",))['syntaxResults'] if not result['valid']}
+
+
+# Los errores de estructura se reportan en la línea del encabezado o de la llave
+@pytest.mark.parametrize("code, errors", [
+    ("if (_a > 1) {\n_a = 2;\n}", {}),
+    ("if (_a > 1)\n{\n_a = 2;\n}\nelse\n{\n_a = 3;\n}", {}),
+    ("if (_a > 1) {\n} else if (_a < 0) {\n} else {\n}", {}),
+    ("do {\n_a = _a + 1;\n} while (_a < 3);", {}),
+    ("try {\n} catch (_e) {\n}", {}),
+    ("function int _f(int _x) {\nreturn _x;\n}", {}),
+    ("for (int _i = 0; _i < 3; _i = _i + 1) {\n}", {}),
+    ("while (_a) {\n_a = 1;", {1: "Bloque sin cerrar"}),
+    ("_a = 1;\n}", {2: "Llave de cierre sin bloque abierto"}),
+    ("_a = 1;\nelse {\n}", {2: "else sin if previo"}),
+    ("do {\n}\n_a = 1;", {1: "Se esperaba 'while' después del bloque do"}),
+    ("if (_a)\n_a = 1;", {1: "Se esperaba '{' después de if"}),
+    ("try {\n}\n_a = 1;", {1: "Se esperaba 'catch' después del bloque try"}),
+])
+def test_block_structure(code, errors):
+    assert syntax_errors(code) == errors
+
+
+def test_program_tree():
+    lex = Lexer("function int _f(int _x) {\nwhile (_x > 0) {\n_x = _x - 1;\n}\n}\nif (_a) {\n}")
+    lex.tokenize()
+    function, condition = lex.program.statements
+    assert isinstance(function, FunctionDecl) and function.line == 1
+    loop = function.body.statements[0]
+    assert isinstance(loop, While) and loop.line == 2
+    update = loop.body.statements[0]
+    assert isinstance(update, Assignment) and update.target == Name('_x')
+    assert isinstance(update.value, BinaryOp) and update.value.operator == '-' and update.value.left == Name('_x')
+    assert isinstance(condition, If) and condition.orelse is None
+
+
+def test_deep_nesting_does_not_recurse():
+    depth = 20000
+    line = "_r = " + "(" * depth + "_a + 1" + ")" * depth + ";"
+    assert line_expression(line)['prefix'] == "_r = + _a 1"
+    blocks = "if (_a) {\n" * 5000 + "}\n" * 5000
+    assert syntax_errors(blocks) == {}
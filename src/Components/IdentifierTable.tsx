@@ -6,6 +6,8 @@ interface Identifier {
   name: string;
   value: number;
   line: string;
+  firstLine: number;
+  occurrences: number;
 }
 
 interface IdentifierProps {
@@ -55,7 +57,9 @@ export function IdentifierTable({ identificadores }: IdentifierProps) {
             <Th>Nombre</Th>
             <Th>Tipo</Th>
             <Th>Valor</Th>
-            <Th>Línea</Th>
+            <Th>Primera línea</Th>
+            <Th>Última línea</Th>
+            <Th>Apariciones</Th>
           </Tr>
         </Thead>
         <Tbody>
@@ -64,7 +68,9 @@ export function IdentifierTable({ identificadores }: IdentifierProps) {
               <Td>{id.name}</Td>
               <Td>{id.type}</Td>
               <Td>{id.value}</Td>
+              <Td>{id.firstLine}</Td>
               <Td>{id.line}</Td>
+              <Td>{id.occurrences}</Td>
             </Tr>
           ))}
         </Tbody>
@@ -1,11 +1,30 @@
-export async function tokenizeCode(code: string) {
+// `fields` limita las secciones calculadas (por ejemplo ['tokens', 'errores']); sin él llegan todas
+export async function tokenizeCode(code: string, fields?: string[]) {
   try {
     const response = await fetch('http://127.0.0.1:5000/tokenize', {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ code }),
+      body: JSON.stringify({ code, fields }),
+    });
+
+    const data = await response.json();
+
+    return data;
+  } catch (error) {
+    console.error(error);
+  }
+}
+
+export async function openIncrementalDocument(code: string, documentId?: string) {
+  try {
+    const response = await fetch('http://127.0.0.1:5000/tokenize/incremental', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ code, documentId }),
     });
 
     const data = await response.json();
@@ -15,3 +34,134 @@ export async function tokenizeCode(code: string) {
     console.error(error);
   }
 }
+
+export async function tokenizeEdit(documentId: string, startLine: number, endLine: number, text: string) {
+  try {
+    const response = await fetch('http://127.0.0.1:5000/tokenize/incremental', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ documentId, startLine, endLine, text }),
+    });
+
+    const data = await response.json();
+
+    return data;
+  } catch (error) {
+    console.error(error);
+  }
+}
+
+export async function tokenizeCodeStream(code: string, onRecord: (record: any) => void) {
+  try {
+    const response = await fetch('http://127.0.0.1:5000/tokenize?stream=ndjson', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ code }),
+    });
+
+    // Cada línea del cuerpo es un registro JSON (tokens de una línea o una sección)
+    const reader = response.body!.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const lines = buffer.split('\n');
+      buffer = lines.pop() ?? '';
+      for (const line of lines) {
+        if (line) onRecord(JSON.parse(line));
+      }
+    }
+
+    if (buffer) onRecord(JSON.parse(buffer));
+  } catch (error) {
+    console.error(error);
+  }
+}
+
+// Formato binario columnar de los tokens (ver pythonServer/binary_tokens.py)
+const NOVA_TOKENS_MEDIA_TYPE = 'application/x-nova-tokens';
+
+export function decodeNovaTokens(buffer: ArrayBuffer, code: string) {
+  const data = new Uint8Array(buffer);
+  const utf8 = new TextDecoder();
+  let position = 0;
+
+  const readVarint = () => {
+    let result = 0;
+    let factor = 1;
+    while (true) {
+      const byte = data[position++];
+      result += (byte & 0x7f) * factor;
+      if (byte < 0x80) return result;
+      factor *= 128;
+    }
+  };
+  const readString = () => {
+    const length = readVarint();
+    const text = utf8.decode(data.subarray(position, position + length));
+    position += length;
+    return text;
+  };
+
+  if (utf8.decode(data.subarray(0, 4)) !== 'NVT1') {
+    throw new Error('No es una respuesta binaria de tokens de Nova');
+  }
+  position = 4;
+  const result = JSON.parse(readString());
+  if (data[position++] === 0) return result;
+
+  const types = Array.from({ length: readVarint() }, readString);
+  const names = Array.from({ length: readVarint() }, readString);
+  const count = readVarint();
+  const tokenTypes = Array.from({ length: count }, () => types[readVarint()]);
+  const lines: number[] = [];
+  let line = 0;
+  for (let i = 0; i < count; i++) {
+    line += readVarint();
+    lines.push(line);
+  }
+
+  // Los desplazamientos cuentan caracteres (code points), no unidades UTF-16
+  const source = /[\uD800-\uDFFF]/.test(code) ? Array.from(code) : null;
+  const tokens = [];
+  let previousEnd = 0;
+  for (let i = 0; i < count; i++) {
+    if (tokenTypes[i] === 'IDEN') {
+      const id = readVarint();
+      tokens.push({ type: 'IDEN', id, value: names[id - 1], line: lines[i] });
+    } else {
+      const start = previousEnd + readVarint();
+      previousEnd = start + readVarint();
+      const value = source ? source.slice(start, previousEnd).join('') : code.slice(start, previousEnd);
+      tokens.push({ type: tokenTypes[i], value, line: lines[i] });
+    }
+  }
+  result.tokens = tokens;
+  return result;
+}
+
+// Igual que tokenizeCode pero con los tokens en el formato binario (respuestas mucho más pequeñas)
+export async function tokenizeCodeBinary(code: string, fields?: string[]) {
+  try {
+    const response = await fetch('http://127.0.0.1:5000/tokenize', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: NOVA_TOKENS_MEDIA_TYPE,
+      },
+      body: JSON.stringify({ code, fields }),
+    });
+
+    return decodeNovaTokens(await response.arrayBuffer(), code);
+  } catch (error) {
+    console.error(error);
+  }
+}